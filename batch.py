@@ -0,0 +1,162 @@
+# batch.py
+"""
+Reorient and re-save segmentations in bulk, without the GUI:
+
+    python batch.py manifest.csv --output-dir out/ --jobs 8
+
+The manifest is a CSV file with ``image`` and ``segmentation`` columns and
+an optional ``output`` column. Each segmentation is brought into canonical
+orientation and saved in the orientation of its image, exactly like
+"Save Segmentation" in the application.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import nibabel as nib
+
+from utils.segmentation_utils.load_segmentation import (
+    canonical_shape,
+    read_canonical_labels,
+)
+from utils.segmentation_utils.transform_save_segmentation import (
+    DEFAULT_COMPRESSION_LEVEL,
+    save_transform_segmentation,
+)
+
+
+def read_manifest(manifest_path, output_dir=None):
+    """
+    :return: list of (image path, segmentation path, output path); relative
+             paths are resolved against the manifest directory
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    pairs = []
+    with open(manifest_path, newline="") as f:
+        for row in csv.DictReader(f):
+            image_path = os.path.join(base, row["image"].strip())
+            segmentation_path = os.path.join(base, row["segmentation"].strip())
+            output_path = (row.get("output") or "").strip()
+            if output_path:
+                output_path = os.path.join(base, output_path)
+            else:
+                name = os.path.basename(segmentation_path)
+                for suffix in (".nii.gz", ".nii"):
+                    if name.endswith(suffix):
+                        name = name[: -len(suffix)]
+                        break
+                output_path = os.path.join(
+                    output_dir or os.path.dirname(segmentation_path),
+                    f"{name}_reoriented.nii.gz",
+                )
+            pairs.append((image_path, segmentation_path, output_path))
+    return pairs
+
+
+def process_pair(image_path, segmentation_path, output_path, compresslevel):
+    """
+    Load, canonicalize and save one segmentation in the orientation of its image.
+    Runs in a worker process.
+    :return: dict with status ("ok", "skipped" or "failed"), seconds, nbytes and message
+    """
+    start = time.perf_counter()
+    try:
+        # Headers only: nothing is decoded before the shapes are known to match
+        image = nib.load(image_path)
+        segmentation = nib.load(segmentation_path)
+        image_shape = canonical_shape(image)
+        segmentation_shape = canonical_shape(segmentation)
+        if image_shape != segmentation_shape:
+            return {
+                "status": "skipped",
+                "seconds": time.perf_counter() - start,
+                "nbytes": 0,
+                "message": (
+                    f"shape {segmentation_shape} does not match image {image_shape}"
+                ),
+            }
+
+        labels = read_canonical_labels(segmentation)
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        save_transform_segmentation(
+            labels, image.affine, image.header, output_path, compresslevel
+        )
+        return {
+            "status": "ok",
+            "seconds": time.perf_counter() - start,
+            "nbytes": int(labels.nbytes),
+            "message": output_path,
+        }
+    except Exception as e:
+        return {
+            "status": "failed",
+            "seconds": time.perf_counter() - start,
+            "nbytes": 0,
+            "message": f"{type(e).__name__}: {e}",
+        }
+
+
+def run_batch(pairs, jobs=None, compresslevel=DEFAULT_COMPRESSION_LEVEL, report=print):
+    """
+    Process (image, segmentation, output) triples on a process pool.
+    :return: list of (segmentation path, result dict) in completion order
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(process_pair, *pair, compresslevel): pair[1]
+            for pair in pairs
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results.append((futures[future], result))
+            report(
+                f"{result['status']:<8} {result['seconds']:7.2f} s  "
+                f"{futures[future]}  {result['message']}"
+            )
+    return results
+
+
+def summarize(results, wall_seconds):
+    counts = {status: 0 for status in ("ok", "skipped", "failed")}
+    for _, result in results:
+        counts[result["status"]] += 1
+    nbytes = sum(result["nbytes"] for _, result in results)
+    seconds = max(wall_seconds, 1e-9)
+    return (
+        f"{counts['ok']} saved, {counts['skipped']} skipped, {counts['failed']} failed "
+        f"in {wall_seconds:.1f} s ({len(results) / seconds:.1f} files/s, "
+        f"{nbytes / 1024**2 / seconds:.1f} MB/s of labels)"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reorient and re-save segmentations")
+    parser.add_argument(
+        "manifest", help="CSV with image, segmentation[, output] columns"
+    )
+    parser.add_argument(
+        "--output-dir", help="directory for outputs without an output column"
+    )
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes")
+    parser.add_argument(
+        "--compresslevel",
+        type=int,
+        default=DEFAULT_COMPRESSION_LEVEL,
+        help="gzip level (0-9)",
+    )
+    args = parser.parse_args(argv)
+
+    pairs = read_manifest(args.manifest, args.output_dir)
+    start = time.perf_counter()
+    results = run_batch(pairs, args.jobs, args.compresslevel)
+    print(summarize(results, time.perf_counter() - start))
+    return 1 if any(result["status"] == "failed" for _, result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
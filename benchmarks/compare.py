@@ -0,0 +1,47 @@
+# benchmarks/compare.py
+"""
+Compare two benchmark result files and fail on regressions:
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.25
+"""
+
+import argparse
+import sys
+
+from benchmarks.timing import compare_results, load_results
+
+
+def print_comparison(rows, threshold):
+    width = max((len(name) for name, *_ in rows), default=10)
+    for name, before, after, ratio, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(
+            f"{name:<{width}}  {before:10.3f} ms  {after:10.3f} ms  "
+            f"{ratio:6.2f}x  {flag}"
+        )
+    regressions = sum(1 for row in rows if row[4])
+    print(
+        f"{regressions} regression(s) beyond {threshold:.0%} of {len(rows)} benchmarks"
+    )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare PASCAL benchmark results")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--metric", default="median_ms")
+    args = parser.parse_args(argv)
+
+    rows = compare_results(
+        load_results(args.baseline),
+        load_results(args.current),
+        args.threshold,
+        args.metric,
+    )
+    return 1 if print_comparison(rows, args.threshold) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
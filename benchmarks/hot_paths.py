@@ -0,0 +1,194 @@
+# benchmarks/hot_paths.py
+import os
+
+import nibabel as nib
+import numpy as np
+from PyQt5.QtCore import QPoint
+from PyQt5.QtGui import QImage
+from PyQt5.QtWidgets import QApplication
+
+from benchmarks.timing import measure, with_throughput
+from utils.segmentation_utils.drawing_segmentation import (
+    render_segmentation_from_matrix,
+    update_segmentation_matrix,
+)
+from utils.segmentation_utils.transform_save_segmentation import (
+    save_transform_segmentation,
+)
+from utils.volume_utils import volume_cache
+from utils.volume_utils.slice_accessor import VIEW_GEOMETRY
+from utils.volume_utils.volume_loader import open_volume
+from windows.main_window import MainWindow
+
+CANVAS_SIZES = ((512, 512), (1024, 1024), (2048, 2048))
+BRUSH_SIZES = (1, 8, 32)
+INVALIDATION_BOX_SIZES = (8, 32, 128)
+
+
+def make_volume(directory, shape, dtype, compressed=False):
+    """Write a synthetic volume (a bright ellipsoid in noise) with an LPS affine."""
+    rng = np.random.default_rng(0)
+    grid = np.ogrid[tuple(slice(0, length) for length in shape)]
+    distance = sum(
+        ((axis - length / 2) / (length / 3)) ** 2 for axis, length in zip(grid, shape)
+    )
+    data = np.where(distance < 1, 800.0, 0.0) + rng.normal(0, 100, shape)
+    if np.dtype(dtype).kind in "iu":
+        info = np.iinfo(dtype)
+        data = np.clip(data, info.min, info.max)
+    data = np.asfortranarray(data.astype(dtype))
+
+    suffix = ".nii.gz" if compressed else ".nii"
+    file_path = os.path.join(directory, f"volume_{'x'.join(map(str, shape))}{suffix}")
+    nib.save(nib.Nifti1Image(data, np.diag([-1.0, -1.0, 1.0, 1.0])), file_path)
+    return file_path
+
+
+def open_window(file_path, window_size=(1800, 700)):
+    window = MainWindow()
+    window.resize(*window_size)
+    window.show()
+    window.set_volume(open_volume(file_path))
+    QApplication.processEvents()
+    return window
+
+
+def bench_slice_fetch(window, results, repeat):
+    for view in VIEW_GEOMETRY:
+        num_slices = window.nifti_accessors[view].num_slices
+        indices = iter(range(10**9))
+
+        def fetch():
+            window.get_slice_for_view(view, next(indices) % num_slices)
+
+        results[f"slice_fetch/{view}"] = measure(fetch, repeat)
+
+
+def bench_render(window, results, repeat):
+    canvas = window.canvas_for_view("axial")
+    accessor = window.nifti_accessors["axial"]
+    array = accessor.get(accessor.num_slices // 2)
+
+    labels = np.zeros(array.shape, dtype=np.uint8)
+    labels[array.shape[0] // 4 : array.shape[0] // 2, array.shape[1] // 4 :] = 2
+
+    for size in CANVAS_SIZES:
+        name = f"{size[0]}x{size[1]}"
+        results[f"render/background/{name}"] = measure(
+            lambda: canvas.create_index_image(array, size), repeat
+        )
+
+        canvas.background_indices = canvas.create_index_image(array, size)
+        results[f"render/window_lut/{name}"] = measure(
+            canvas.create_windowed_image, repeat
+        )
+
+        overlay = QImage(size[0], size[1], QImage.Format_ARGB32)
+        results[f"render/overlay/{name}"] = measure(
+            lambda: render_segmentation_from_matrix(
+                overlay, labels, "axial", canvas.label_lut
+            ),
+            repeat,
+        )
+    canvas.update_slice_display()
+
+
+def bench_stroke(window, results, repeat):
+    canvas = window.canvas_for_view("axial")
+    width, height = canvas.display_size()
+    positions = iter(range(10**9))
+
+    def next_point():
+        step = next(positions)
+        return QPoint(
+            width // 4 + (step * 7) % (width // 2),
+            height // 4 + (step * 3) % (height // 2),
+        )
+
+    for brush_size in BRUSH_SIZES:
+        canvas.set_brush_size(brush_size)
+
+        def stroke():
+            canvas.draw_segmentation(next_point())
+            canvas.last_point = canvas.translate_mouse_position(next_point())
+            QApplication.processEvents()
+
+        results[f"stroke/canvas/brush_{brush_size}px"] = measure(stroke, repeat)
+
+        matrix = canvas.segmentation_array.copy()
+        results[f"stroke/update_matrix/brush_{brush_size}px"] = measure(
+            lambda: update_segmentation_matrix(
+                matrix,
+                next_point(),
+                next_point(),
+                brush_size,
+                canvas.background_image,
+                1,
+            ),
+            repeat,
+        )
+    window.finish_stroke("axial")
+
+
+def bench_invalidation(window, results, repeat):
+    shape = window.nifti_volume.shape
+    for box_size in INVALIDATION_BOX_SIZES:
+        volume_box = tuple(
+            (
+                max(length // 2 - box_size // 2, 0),
+                min(length // 2 + box_size // 2, length),
+            )
+            for length in shape
+        )
+
+        def invalidate():
+            window.invalidate_volume_box(volume_box, exclude_view="axial")
+            QApplication.processEvents()
+
+        results[f"invalidate/volume_box_{box_size}"] = measure(invalidate, repeat)
+
+
+def bench_io(directory, shape, dtype, results, repeat):
+    for compressed in (False, True):
+        file_path = make_volume(directory, shape, dtype, compressed)
+        kind = "nii_gz" if compressed else "nii"
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+        results[f"load/{kind}/cold"] = with_throughput(
+            measure(lambda: open_volume(file_path), repeat, 1, volume_cache.clear),
+            nbytes,
+        )
+        if compressed:
+            results[f"load/{kind}/cached"] = with_throughput(
+                measure(lambda: open_volume(file_path), repeat, 1), nbytes
+            )
+
+    volume = open_volume(file_path)
+    labels = np.zeros(volume.shape, dtype=np.uint8)
+    labels[tuple(slice(length // 4, length // 2) for length in volume.shape)] = 1
+    out_path = os.path.join(directory, "labels.nii.gz")
+    results["save/nii_gz"] = with_throughput(
+        measure(
+            lambda: save_transform_segmentation(
+                labels, volume.affine, volume.header, out_path
+            ),
+            repeat,
+            1,
+        ),
+        labels.nbytes,
+    )
+
+
+def run_all(directory, shape, dtype, repeat=20, io_repeat=3):
+    """Run every benchmark on a synthetic volume and return {name: timing}."""
+    results = {}
+    window = open_window(make_volume(directory, shape, dtype))
+    try:
+        bench_slice_fetch(window, results, repeat)
+        bench_render(window, results, repeat)
+        bench_stroke(window, results, repeat)
+        bench_invalidation(window, results, repeat)
+    finally:
+        window.close()
+    bench_io(directory, shape, dtype, results, io_repeat)
+    return results
@@ -0,0 +1,91 @@
+# benchmarks/run_benchmarks.py
+"""
+Headless benchmarks of the canvas and I/O hot paths on synthetic volumes:
+
+    python -m benchmarks.run_benchmarks --shape 256 256 160 -o current.json
+    python -m benchmarks.run_benchmarks -o current.json --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Run the PASCAL benchmark suite")
+    parser.add_argument("--shape", type=int, nargs=3, default=[256, 256, 160])
+    parser.add_argument("--dtype", default="int16")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--io-repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="pascal_bench_") as directory:
+        # Keep journals and cached volumes of the synthetic data out of ~/.pascal;
+        # both directories are read when the modules are imported
+        os.environ["PASCAL_JOURNAL_DIR"] = os.path.join(directory, "journal")
+        os.environ["PASCAL_CACHE_DIR"] = os.path.join(directory, "volume_cache")
+
+        from PyQt5.QtWidgets import QApplication
+
+        from benchmarks.hot_paths import run_all
+
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+        results = run_all(
+            directory, tuple(args.shape), args.dtype, args.repeat, args.io_repeat
+        )
+
+    import numpy as np
+    from PyQt5.QtCore import QT_VERSION_STR
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "shape": args.shape,
+            "dtype": args.dtype,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "qt": QT_VERSION_STR,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "qpa_platform": app.platformName(),
+        },
+        "results": results,
+    }
+
+    for name, timing in sorted(results.items()):
+        throughput = f"  {timing['mb_per_s']:8.1f} MB/s" if "mb_per_s" in timing else ""
+        print(
+            f"{name:<40} {timing['median_ms']:10.3f} ms  "
+            f"p95 {timing['p95_ms']:10.3f} ms{throughput}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        from benchmarks.compare import print_comparison
+        from benchmarks.timing import compare_results, load_results
+
+        rows = compare_results(load_results(args.compare), report, args.threshold)
+        print()
+        return 1 if print_comparison(rows, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# benchmarks/timing.py
+import json
+import statistics
+import time
+
+
+def measure(function, repeat=20, warmup=2, setup=None):
+    """
+    Time a callable.
+    :param setup: optional callable run (untimed) before every call
+    :return: dict of timings in milliseconds
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        function()
+
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000.0)
+
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(int(len(samples) * 0.95), len(samples) - 1)],
+        "min_ms": samples[0],
+        "mean_ms": statistics.fmean(samples),
+        "repeat": repeat,
+    }
+
+
+def with_throughput(timing, nbytes):
+    """Add MB/s (based on the median) to a timing dict."""
+    timing["mb_per_s"] = nbytes / 1024**2 / (timing["median_ms"] / 1000.0)
+    return timing
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_results(
+    baseline, current, threshold=0.25, metric="median_ms", min_delta_ms=0.05
+):
+    """
+    Compare two result files benchmark by benchmark.
+    :param threshold: allowed relative slowdown (0.25: 25 % slower)
+    :param min_delta_ms: slowdowns smaller than this are timer noise, never regressions
+    :return: list of (name, baseline ms, current ms, ratio, regressed)
+    """
+    rows = []
+    for name, timing in sorted(current["results"].items()):
+        reference = baseline["results"].get(name)
+        if reference is None or metric not in reference or metric not in timing:
+            continue
+        ratio = timing[metric] / max(reference[metric], 1e-9)
+        regressed = (
+            ratio > 1 + threshold and timing[metric] - reference[metric] > min_delta_ms
+        )
+        rows.append((name, reference[metric], timing[metric], ratio, regressed))
+    return rows
@@ -1,17 +1,45 @@
+from functools import lru_cache
+
+from canvas.slice_view import SliceView
 from utils.cache_utils.cache_decorators import slice_cache
-from utils.image_utils.normalize import min_max_normalize
+from utils.cache_utils.slice_cache import next_generation
+from utils.image_utils.resample import fit_size, resize_bilinear
+from utils.image_utils.window_level import (
+    build_window_lut,
+    intensity_mapping,
+    to_lut_indices,
+)
 from utils.segmentation_utils.drawing_segmentation import (
+    build_label_lut,
+    to_matrix_coordinates,
     update_segmentation_matrix,
     render_segmentation_from_matrix,
+    render_segmentation_region,
 )
+from utils.trace_utils.tracing import traced
+import numpy as np
 from PyQt5.QtCore import Qt, QPoint, pyqtSignal
-from PyQt5.QtGui import QColor, QImage, QPainter, QPixmap
-from PyQt5.QtWidgets import QLabel, QSizePolicy, QScrollBar, QHBoxLayout, QWidget
+from PyQt5.QtGui import QColor, QImage
+from PyQt5.QtWidgets import QSizePolicy, QScrollBar, QHBoxLayout, QWidget
+
+# Fraction of the intensity range one pixel of window/level dragging moves
+WINDOW_DRAG_SENSITIVITY = 0.002
+
+
+@lru_cache(maxsize=8)
+def empty_overlay(width, height):
+    """Transparent overlay shared by all empty slices of a size; never paint into it."""
+    image = QImage(width, height, QImage.Format_ARGB32)
+    image.fill(Qt.transparent)
+    return image
 
 
 class Canvas(QWidget):
-    segmentation_updated = pyqtSignal(set, str)
+    segmentation_updated = pyqtSignal(object, str, int)
+    stroke_finished = pyqtSignal(str)
     request_slice = pyqtSignal(int, str)
+    window_level_changed = pyqtSignal(float, float)
+    seed_selected = pyqtSignal(str, int, int, int)
 
     def __init__(self, view):
         super().__init__()
@@ -22,11 +50,16 @@ class Canvas(QWidget):
     def create_ui_elements(self):
         """Create and set up UI elements for the canvas."""
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        # Keyboard focus for the labelled slice navigation keys
+        self.setFocusPolicy(Qt.WheelFocus)
 
-        # Main label to display images
-        self.label = QLabel(self)
-        self.label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.label.setMinimumSize(300, 300)
+        # Compositor displaying the slice and its segmentation overlay
+        self.slice_view = SliceView(self)
+        self.slice_view.setMinimumSize(300, 300)
+        self.slice_view.cache_stats = lambda: {
+            "image": self.render_cached_image.cache_info()["hit_rate"],
+            "label": self.render_cached_segmentation.cache_info()["hit_rate"],
+        }
 
         # Scroll bar to navigate through slices
         self.scroll_bar = QScrollBar(Qt.Vertical, self)
@@ -36,7 +69,7 @@ class Canvas(QWidget):
 
         # Layout configuration
         self.layout = QHBoxLayout(self)
-        self.layout.addWidget(self.label)
+        self.layout.addWidget(self.slice_view)
         self.layout.addWidget(self.scroll_bar)
         self.layout.setContentsMargins(0, 0, 0, 0)
 
@@ -49,9 +82,14 @@ class Canvas(QWidget):
         self.brush_color = QColor(255, 0, 0, 255)  # Default to red
         self.brush_size = 8
         self.brush_color_value = 1  # Default color value (1 for drawing)
+        self.label_lut = build_label_lut()
+        self.tool = "brush"  # 'brush' or 'region_grow'
+        self.occupancy = None  # ViewOccupancy of the label store, if any
 
         self.background_array = None
         self.segmentation_array = None
+        self.background_indices = None  # cached LUT indices at display size
+        self.background_gray = None  # windowed pixels behind background_image
         self.background_image = None
         self.segmentation_image = None
 
@@ -59,39 +97,47 @@ class Canvas(QWidget):
         self.nifti_min = None
         self.nifti_max = None
 
+        # Intensity -> LUT index mapping and the current window/level LUT
+        self.intensity_offset = 0.0
+        self.intensity_scale = 1.0
+        self.window_width = None
+        self.window_level = None
+        self.window_lut = None
+        self.window_drag_start = None
+
+        # Data generations are part of the cache keys; bump them on new data
+        self.volume_generation = next_generation()
+        self.label_generation = next_generation()
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
         if self.background_image:
             self.update_slice_display()
 
+    def display_size(self):
+        """Size of the slice view as a (width, height) tuple."""
+        return (self.slice_view.width(), self.slice_view.height())
+
+    @traced()
     def update_slice_display(self):
         """Update the displayed slice images."""
-        size_tuple = (self.label.size().width(), self.label.size().height())
-        self.background_image = self.render_cached_image(
+        self.slice_view.start_frame()
+        size_tuple = self.display_size()
+        self.background_indices = self.render_cached_image(
             self.current_slice_index, size_tuple
         )
-        self.segmentation_image = self.render_cached_segmentation(
+        self.background_image = self.create_windowed_image()
+        self.segmentation_image = self.render_segmentation(
             self.current_slice_index, size_tuple
         )
         self.update_display()
 
     def update_display(self):
-        """Combine background and segmentation images and update the label display."""
+        """Hand the current background and segmentation layers to the slice view."""
         if not (self.background_image and self.segmentation_image):
             return
 
-        combined_image = self.create_combined_image()
-        self.label.setPixmap(QPixmap.fromImage(combined_image))
-
-    def create_combined_image(self):
-        """Create a combined image from background and segmentation."""
-        combined_image = QImage(self.label.size(), QImage.Format_ARGB32)
-        combined_image.fill(Qt.transparent)
-        painter = QPainter(combined_image)
-        painter.drawImage(self.label.rect(), self.background_image)
-        painter.drawImage(self.label.rect(), self.segmentation_image)
-        painter.end()
-        return combined_image
+        self.slice_view.set_layers(self.background_image, self.segmentation_image)
 
     def set_slice_data(self, nifti_slice, segmentation_slice):
         """Set NIfTI and segmentation data for a specific slice."""
@@ -117,12 +163,25 @@ class Canvas(QWidget):
         return True
 
     def set_initial_background(
-        self, nifti_array, segment_array, nifti_shape, min_val, max_val
+        self, nifti_array, segment_array, nifti_shape, min_val, max_val, window=None
     ):
-        """Set initial background and segmentation arrays."""
+        """
+        Set initial background and segmentation arrays.
+        :param min_val: minimum intensity of the volume
+        :param max_val: maximum intensity of the volume
+        :param window: initial (width, level); the full intensity range if None
+        """
         self.nifti_shape = nifti_shape
         self.nifti_min = min_val
         self.nifti_max = max_val
+        self.intensity_offset, self.intensity_scale = intensity_mapping(
+            min_val, max_val, integer=nifti_array.dtype.kind in "iu"
+        )
+        if window is None:
+            window = (max_val - min_val, (max_val + min_val) / 2)
+        self.set_window_level(*window, update=False)
+        self.volume_generation = next_generation()
+        self.label_generation = next_generation()
 
         self.current_slice_index = self.determine_initial_index()
         self.square_length = max(nifti_array.shape)
@@ -155,39 +214,81 @@ class Canvas(QWidget):
         self.scroll_bar.setValue(self.current_slice_index)
         self.update_slice_display()
 
-    @slice_cache(maxsize=100)
+    @slice_cache(generation_attr="volume_generation")
+    @traced()
     def render_cached_image(self, slice_index, size):
-        """Render the background image with caching."""
+        """
+        Render the window/level independent LUT indices of the background
+        with caching.
+        """
         if self.background_array is None or len(self.background_array.shape) != 2:
-            return QImage(size[0], size[1], QImage.Format_Grayscale8)
+            return np.zeros((size[1], size[0]), dtype=np.uint16)
+
+        return self.create_index_image(self.background_array, size)
 
-        return self.create_qimage_from_array(self.background_array, size)
+    def render_segmentation(self, slice_index, size):
+        """Segmentation image of a slice; empty slices share one uncached overlay."""
+        # Most slices carry no labels at all, and the occupancy check is O(1)
+        if self.segmentation_array is None or self.slice_is_empty(slice_index):
+            return empty_overlay(*size)
+        return self.render_cached_segmentation(slice_index, size)
 
-    @slice_cache(maxsize=100)
+    @slice_cache(generation_attr="label_generation")
+    @traced()
     def render_cached_segmentation(self, slice_index, size):
-        """Render the segmentation image with caching."""
+        """Render the segmentation image of a labelled slice with caching."""
         segmentation_image = QImage(size[0], size[1], QImage.Format_ARGB32)
-        segmentation_image.fill(Qt.transparent)
         render_segmentation_from_matrix(
-            segmentation_image, self.segmentation_array, self.canvas_view
+            segmentation_image,
+            self.segmentation_array,
+            self.canvas_view,
+            self.label_lut,
         )
         return segmentation_image
 
-    def create_qimage_from_array(self, array, size):
-        """Create a QImage from a numpy array."""
-        normalized_image = min_max_normalize(array, self.nifti_min, self.nifti_max)
-        height, width = normalized_image.shape
-        bytes_per_line = width
-        qimage = QImage(
-            normalized_image.tobytes(),
-            width,
-            height,
-            bytes_per_line,
-            QImage.Format_Grayscale8,
+    def slice_is_empty(self, slice_index):
+        """True if a slice has no labels, answered by the occupancy index when set."""
+        if self.occupancy is None:
+            return not self.segmentation_array.any()
+        return self.occupancy.is_empty(slice_index)
+
+    def background_cache_key(self, slice_index):
+        """Cache key of the background image of a slice at the current size."""
+        return self.render_cached_image.cache_key(
+            self, slice_index, self.display_size()
         )
-        return qimage.scaled(
-            size[0], size[1], Qt.KeepAspectRatio, Qt.SmoothTransformation
+
+    @traced()
+    def create_index_image(self, array, size):
+        """Convert a slice to LUT indices, scaled to fit the display size."""
+        indices = to_lut_indices(array, self.intensity_offset, self.intensity_scale)
+        width, height = fit_size(indices.shape, size)
+        return resize_bilinear(indices, width, height)
+
+    def create_windowed_image(self):
+        """Apply the window/level LUT to the cached background indices."""
+        if self.background_indices is None or self.window_lut is None:
+            return None
+        self.background_gray = self.window_lut.take(self.background_indices)
+        height, width = self.background_gray.shape
+        return QImage(
+            self.background_gray.data, width, height, width, QImage.Format_Grayscale8
+        )
+
+    def set_window_level(self, width, level, update=True):
+        """Change the display window; cached slices are reused as they are."""
+        self.window_width = max(float(width), 1e-6)
+        self.window_level = float(level)
+        self.window_lut = build_window_lut(
+            self.window_width,
+            self.window_level,
+            self.intensity_offset,
+            self.intensity_scale,
         )
+        if update and self.background_indices is not None:
+            self.slice_view.start_frame()
+            self.background_image = self.create_windowed_image()
+            self.slice_view.set_background(self.background_image)
 
     def scroll_to_slice(self, value):
         """Handle scrolling to a new slice."""
@@ -208,7 +309,19 @@ class Canvas(QWidget):
         return 0
 
     def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
+        if (
+            event.button() == Qt.LeftButton
+            and self.tool == "region_grow"
+            and self.segmentation_array is not None
+        ):
+            # Region grow: report the clicked voxel as the seed instead of painting
+            x, y = to_matrix_coordinates(
+                self.translate_mouse_position(event.pos()),
+                self.segmentation_array.shape,
+                self.background_image,
+            )
+            self.seed_selected.emit(self.canvas_view, self.current_slice_index, y, x)
+        elif event.button() == Qt.LeftButton:
             self.last_point = self.translate_mouse_position(event.pos())
             self.drawing = True
             self.draw_segmentation(event.pos(), draw_mode="draw")  # Left click to draw
@@ -220,9 +333,14 @@ class Canvas(QWidget):
                 event.pos(), draw_mode="erase"
             )  # Right click to erase
             self.last_point = self.translate_mouse_position(event.pos())
+        elif event.button() == Qt.MiddleButton and self.window_lut is not None:
+            # Middle drag: horizontal changes the window width, vertical the level
+            self.window_drag_start = (event.pos(), self.window_width, self.window_level)
 
     def mouseMoveEvent(self, event):
-        if event.buttons() & Qt.LeftButton and self.drawing:
+        if event.buttons() & Qt.MiddleButton and self.window_drag_start is not None:
+            self.drag_window_level(event.pos())
+        elif event.buttons() & Qt.LeftButton and self.drawing:
             self.draw_segmentation(event.pos(), draw_mode="draw")  # Left click to draw
             self.last_point = self.translate_mouse_position(event.pos())
         elif event.buttons() & Qt.RightButton and self.drawing:
@@ -234,18 +352,31 @@ class Canvas(QWidget):
     def mouseReleaseEvent(self, event):
         if event.button() in [Qt.LeftButton, Qt.RightButton]:
             self.drawing = False
+            self.stroke_finished.emit(self.canvas_view)
+        elif event.button() == Qt.MiddleButton:
+            self.window_drag_start = None
+
+    def drag_window_level(self, pos):
+        start_pos, start_width, start_level = self.window_drag_start
+        step = (self.nifti_max - self.nifti_min) * WINDOW_DRAG_SENSITIVITY
+        width = max(start_width + (pos.x() - start_pos.x()) * step, step)
+        level = start_level - (pos.y() - start_pos.y()) * step
+        self.set_window_level(width, level)
+        self.window_level_changed.emit(self.window_width, self.window_level)
 
     def translate_mouse_position(self, pos):
         """Translate the mouse position to the image position."""
         if self.background_image is None:
             return pos
 
-        x_ratio = self.background_image.width() / self.label.width()
-        y_ratio = self.background_image.height() / self.label.height()
+        x_ratio = self.background_image.width() / self.slice_view.width()
+        y_ratio = self.background_image.height() / self.slice_view.height()
         return QPoint(int(pos.x() * x_ratio), int(pos.y() * y_ratio))
 
+    @traced()
     def draw_segmentation(self, pos, draw_mode="draw"):
         """Draw or erase segmentation on the image."""
+        self.slice_view.start_frame()
         pos = self.translate_mouse_position(pos)
 
         if draw_mode == "erase":
@@ -255,7 +386,7 @@ class Canvas(QWidget):
                 self.brush_color_value
             )  # Draw mode uses current brush color
 
-        updated_pos = update_segmentation_matrix(
+        stroke_region = update_segmentation_matrix(
             self.segmentation_array,
             self.last_point,
             pos,
@@ -263,32 +394,117 @@ class Canvas(QWidget):
             self.background_image,
             current_brush_value,
         )
+        if stroke_region is None:
+            return
 
-        self.update_and_invalidate_cache(updated_pos)
+        self.update_and_invalidate_cache(stroke_region)
 
-    def update_and_invalidate_cache(self, pos):
-        """Update the segmentation image and invalidate cache for the current slice."""
-        size_tuple = (self.label.size().width(), self.label.size().height())
-        self.render_cached_segmentation.cache_invalidate(self.current_slice_index)
-        self.segmentation_image = self.render_cached_segmentation(
-            self.current_slice_index, size_tuple
+    def update_and_invalidate_cache(self, stroke_region):
+        """Notify the other canvases of a stroke and update the segmentation image."""
+        # Committing first keeps the occupancy index current for the re-render
+        self.segmentation_updated.emit(
+            stroke_region, self.canvas_view, self.current_slice_index
         )
-        self.update_display()
-        self.segmentation_updated.emit(pos, self.canvas_view)
-
-    def external_update_and_invalidate_cache(self, pos_set):
-        """External update and cache invalidation for the canvas."""
-        size_tuple = (self.label.size().width(), self.label.size().height())
-        for slice_index in pos_set:
-            self.render_cached_segmentation.cache_invalidate(slice_index)
-        self.segmentation_image = self.render_cached_segmentation(
-            self.current_slice_index, size_tuple
+        self.refresh_segmentation_region(stroke_region.bounding_box)
+
+    def refresh_segmentation_region(self, bounding_box=None):
+        """
+        Invalidate the cache for the current slice and update its segmentation image.
+        With a bounding box only that region of the cached overlay is re-rendered.
+        """
+        size_tuple = self.display_size()
+        cache = self.render_cached_segmentation.cache
+        key = self.render_cached_segmentation.cache_key(
+            self, self.current_slice_index, size_tuple
         )
+        segmentation_image = cache.peek(key)
+
+        # Overlays of this slice at other sizes are stale; the current one is patched
+        cache.invalidate(self.canvas_view, self.current_slice_index)
+        # Only labelled slices are cached, so a cached overlay is never shared
+        if segmentation_image is None or bounding_box is None:
+            segmentation_image = self.render_segmentation(
+                self.current_slice_index, size_tuple
+            )
+        else:
+            updated_region = render_segmentation_region(
+                segmentation_image,
+                self.segmentation_array,
+                bounding_box,
+                self.label_lut,
+            )
+            cache.put(key, segmentation_image)
+            if segmentation_image is self.segmentation_image:
+                # The displayed overlay was patched in place; repaint just that area
+                self.slice_view.update_overlay_region(*updated_region)
+                return
+
+        self.segmentation_image = segmentation_image
         self.update_display()
 
+    def external_update_and_invalidate_cache(self, slice_range, bounding_box=None):
+        """
+        Invalidate the cached overlays of a range of slices changed by another canvas.
+        :param slice_range: half-open (start, stop) range of slice indices of this view
+        :param bounding_box: changed (y_min, x_min, y_max, x_max) region of those slices
+        """
+        start, stop = slice_range
+        if not start <= self.current_slice_index < stop:
+            for slice_index in range(start, stop):
+                self.render_cached_segmentation.cache_invalidate(
+                    slice_index, self.canvas_view
+                )
+            return
+
+        for slice_index in range(start, stop):
+            if slice_index != self.current_slice_index:
+                self.render_cached_segmentation.cache_invalidate(
+                    slice_index, self.canvas_view
+                )
+        self.refresh_segmentation_region(bounding_box)
+
     def clear_cached_segmentation(self):
-        """Clear the segmentation cache for the current slice."""
-        self.render_cached_segmentation.cache_clear()
+        """Clear the segmentation cache of this canvas view."""
+        self.render_cached_segmentation.cache_clear(self.canvas_view)
+
+    def reset_segmentation(self):
+        """Mark the segmentation data as replaced so cached overlays are not reused."""
+        self.label_generation = next_generation()
+
+    def set_occupancy(self, occupancy):
+        """Use a ViewOccupancy for empty slice checks and labelled slice jumps."""
+        self.occupancy = occupancy
+
+    def jump_to_labelled_slice(self, step):
+        """Scroll to the next (step > 0) or previous labelled slice."""
+        if self.occupancy is None or self.nifti_shape is None:
+            return
+        if step > 0:
+            target = self.occupancy.next_labelled(self.current_slice_index)
+        else:
+            target = self.occupancy.previous_labelled(self.current_slice_index)
+        if target is not None:
+            self.scroll_bar.setValue(target)
+
+    def keyPressEvent(self, event):
+        """']' / '[' jump to the next / previous slice with labels."""
+        if event.key() == Qt.Key_BracketRight:
+            self.jump_to_labelled_slice(1)
+        elif event.key() == Qt.Key_BracketLeft:
+            self.jump_to_labelled_slice(-1)
+        else:
+            super().keyPressEvent(event)
+
+    def set_show_stats(self, show):
+        """Show frame time and cache hit rates on top of the slice."""
+        self.slice_view.set_show_stats(show)
+
+    def cache_info(self):
+        """Return hit/miss/eviction counters of the background and overlay caches."""
+        return {
+            "image": self.render_cached_image.cache_info(),
+            "segmentation": self.render_cached_segmentation.cache_info(),
+        }
 
     def wheelEvent(self, event):
         """Handle mouse wheel event to change slice index."""
@@ -307,8 +523,21 @@ class Canvas(QWidget):
     def set_brush_color_value(self, color_value):
         self.brush_color_value = color_value
 
+    def set_tool(self, tool):
+        """Select what a left click does: 'brush' paints, 'region_grow' picks a seed."""
+        self.tool = tool
+
+    def set_label_palette(self, palette, opacity=1.0):
+        """Set the label colors ({label: (R, G, B[, A])}) and overlay opacity."""
+        self.label_lut = build_label_lut(palette, opacity)
+        self.clear_cached_segmentation()
+        if self.background_image:
+            self.update_slice_display()
+
     def clear_all_segmentations(self):
         """Clear all segmentations on the canvas."""
+        if self.segmentation_array is not None:
+            self.segmentation_array.fill(0)
         self.clear_cached_segmentation()
-        self.segmentation_image.fill(Qt.transparent)
+        self.segmentation_image = empty_overlay(*self.display_size())
         self.update_display()
@@ -0,0 +1,114 @@
+import time
+
+from PyQt5.QtCore import QRect, Qt
+from PyQt5.QtGui import QColor, QPainter
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+
+from utils.trace_utils.tracing import traced
+
+# Weight of the newest frame in the smoothed frame time of the stats overlay
+FRAME_TIME_SMOOTHING = 0.2
+STATS_RECT = QRect(4, 4, 260, 36)
+
+
+class SliceView(QWidget):
+    """
+    Persistent two-layer compositor: the background slice and the label
+    overlay stay as QImages and are drawn straight from paintEvent, so a
+    brush stroke only repaints the widget area it touched.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.background_image = None
+        self.overlay_image = None
+
+        # Optional frame time / cache hit rate overlay
+        self.show_stats = False
+        self.cache_stats = None  # callable returning {name: hit rate}
+        self.frame_start = None
+        self.frame_time_ms = None
+
+    def set_layers(self, background_image, overlay_image):
+        """Replace both layers and repaint the whole view."""
+        self.background_image = background_image
+        self.overlay_image = overlay_image
+        self.update()
+
+    def set_background(self, background_image):
+        self.background_image = background_image
+        self.update()
+
+    def update_overlay_region(self, x, y, width, height):
+        """Repaint the widget area showing an (x, y, width, height) overlay region."""
+        if self.overlay_image is None or width <= 0 or height <= 0:
+            return
+        x_scale = self.width() / self.overlay_image.width()
+        y_scale = self.height() / self.overlay_image.height()
+        # One pixel of margin covers the smooth scaling of the background edge
+        self.update(
+            QRect(
+                int(x * x_scale) - 1,
+                int(y * y_scale) - 1,
+                int(width * x_scale + 0.999) + 2,
+                int(height * y_scale + 0.999) + 2,
+            )
+        )
+        if self.show_stats:
+            self.update(STATS_RECT)
+
+    def set_show_stats(self, show):
+        self.show_stats = show
+        self.frame_start = None
+        self.update()
+
+    def start_frame(self):
+        """Mark the start of an update; the frame ends when it has been painted."""
+        if self.show_stats and self.frame_start is None:
+            self.frame_start = time.perf_counter()
+
+    @traced()
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self.background_image is None:
+            painter.fillRect(event.rect(), Qt.black)
+        else:
+            painter.drawImage(self.rect(), self.background_image)
+        if self.overlay_image is not None:
+            painter.drawImage(self.rect(), self.overlay_image)
+        if self.show_stats:
+            self.draw_stats(painter)
+        painter.end()
+
+        if self.frame_start is not None:
+            frame_time_ms = (time.perf_counter() - self.frame_start) * 1000.0
+            self.frame_start = None
+            if self.frame_time_ms is None:
+                self.frame_time_ms = frame_time_ms
+            else:
+                self.frame_time_ms += FRAME_TIME_SMOOTHING * (
+                    frame_time_ms - self.frame_time_ms
+                )
+
+    def draw_stats(self, painter):
+        lines = [
+            (
+                "frame: -"
+                if self.frame_time_ms is None
+                else f"frame: {self.frame_time_ms:.1f} ms"
+            )
+        ]
+        if self.cache_stats is not None:
+            lines.append(
+                "  ".join(
+                    f"{name} cache: {rate:.0%}"
+                    for name, rate in self.cache_stats().items()
+                )
+            )
+        painter.fillRect(STATS_RECT, QColor(0, 0, 0, 160))
+        painter.setPen(Qt.yellow)
+        painter.drawText(
+            STATS_RECT.adjusted(4, 2, -4, -2), Qt.AlignLeft, "\n".join(lines)
+        )
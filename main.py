@@ -1,23 +1,53 @@
 # main.py
-from windows.init_window import InitWindow
-from windows.main_window import MainWindow
-from PyQt5.QtWidgets import QApplication
+import time
+
+START_TIME = time.perf_counter()
+
+import argparse
 import sys
 
+from PyQt5.QtWidgets import QApplication
+from utils.startup_utils.startup import StartupTimer, start_warmup
+from windows.init_window import InitWindow
+
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--startup-report",
+        action="store_true",
+        help="print an import/startup time breakdown",
+    )
+    args, qt_args = parser.parse_known_args()
+
+    timer = StartupTimer(START_TIME)
+    timer.mark("PyQt5.QtWidgets imported")
+
+    app = QApplication(sys.argv[:1] + qt_args)
     init_window = InitWindow()
     main_window = None
 
     def launch_main_window(nifti_file_path):
         global main_window
+        # Usually already imported by the warmup thread
+        timer.timed_import("windows.main_window")
+        from windows.main_window import MainWindow
+
         init_window.close()
         main_window = MainWindow(nifti_file_path)
         main_window.show()
+        timer.mark("main window shown")
+        if args.startup_report:
+            print(timer.report(), file=sys.stderr)
 
     init_window.init_loaded.connect(launch_main_window)
     init_window.show()
+    timer.mark("init window shown")
+    if args.startup_report:
+        print(timer.report(), file=sys.stderr)
+
+    # Import the volume handling modules while the user picks a file
+    start_warmup(timer)
 
     sys.exit(app.exec_())
 
@@ -1,8 +1,13 @@
 # menu/file.py
+from functools import partial
+
 from utils.segmentation_utils.transform_save_segmentation import (
+    DEFAULT_COMPRESSION_LEVEL,
     save_transform_segmentation,
 )
-from PyQt5.QtWidgets import QFileDialog
+from utils.thread_utils.task_thread import TaskThread
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QFileDialog, QProgressDialog
 
 
 def load_image_dialog(main_window):
@@ -29,7 +34,13 @@ def load_segmentation_dialog(main_window):
     return file_path
 
 
-def save_segmentation_dialog(main_window, segmentation_matrix, affine, header):
+def save_segmentation_dialog(
+    main_window,
+    segmentation_matrix,
+    affine,
+    header,
+    compresslevel=DEFAULT_COMPRESSION_LEVEL,
+):
     options = QFileDialog.Options()
     file_path, _ = QFileDialog.getSaveFileName(
         main_window,
@@ -38,5 +49,38 @@ def save_segmentation_dialog(main_window, segmentation_matrix, affine, header):
         "NIfTI Files (*.nii.gz)",
         options=options,
     )
-    if file_path:
-        save_transform_segmentation(segmentation_matrix, affine, header, file_path)
+    if not file_path:
+        return None
+
+    # Save a snapshot so painting can continue while the file is written
+    snapshot = segmentation_matrix.snapshot()
+    save_thread = TaskThread(
+        partial(
+            save_transform_segmentation,
+            snapshot,
+            affine,
+            header,
+            file_path,
+            compresslevel,
+        ),
+        main_window,
+    )
+
+    progress_dialog = QProgressDialog(
+        "Saving segmentation...", "Cancel", 0, 100, main_window
+    )
+    progress_dialog.setWindowModality(Qt.NonModal)
+    progress_dialog.setMinimumDuration(500)
+    progress_dialog.canceled.connect(save_thread.cancel)
+    save_thread.progress.connect(
+        lambda done, total: progress_dialog.setValue(int(100 * done / max(total, 1)))
+    )
+    save_thread.failed.connect(
+        lambda message: print(f"Failed to save Segmentation: {message}")
+    )
+    save_thread.finished.connect(progress_dialog.close)
+    save_thread.finished.connect(progress_dialog.deleteLater)
+    save_thread.finished.connect(save_thread.deleteLater)
+
+    save_thread.start()
+    return save_thread
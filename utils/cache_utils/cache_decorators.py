@@ -1,30 +1,62 @@
 # utils/cache_utils/cache_decorators.py
 from functools import wraps
 
+from utils.cache_utils.slice_cache import SliceCache
+from utils.trace_utils import tracing
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def slice_cache(max_bytes=DEFAULT_CACHE_BYTES, generation_attr=None):
+    """
+    Cache a ``method(self, slice_index, *args)`` per canvas view in a SliceCache.
+    :param max_bytes: memory budget of the cache in bytes
+    :param generation_attr: name of the instance attribute holding the data
+                            generation; bumping it makes older entries unreachable
+    """
 
-def slice_cache(maxsize=100):
     def decorator(func):
-        cache = {}
+        cache = SliceCache(max_bytes)
+
+        def cache_key(self, slice_index, *args):
+            generation = getattr(self, generation_attr) if generation_attr else 0
+            return (self.canvas_view, slice_index, generation, args)
 
         @wraps(func)
         def wrapper(self, slice_index, *args):
-            key = (slice_index, args, self.canvas_view)
-            if key not in cache:
-                if len(cache) >= maxsize:
-                    cache.pop(next(iter(cache)))
-                cache[key] = func(self, slice_index, *args)
-            return cache[key]
+            key = cache_key(self, slice_index, *args)
+            value = cache.get(key)
+            if value is None:
+                value = func(self, slice_index, *args)
+                cache.put(key, value)
+            return value
+
+        if tracing.enabled:
+            untraced = wrapper
+
+            @wraps(func)
+            def wrapper(self, slice_index, *args):
+                hit = cache.peek(cache_key(self, slice_index, *args)) is not None
+                tracing.instant(
+                    "cache_hit" if hit else "cache_miss",
+                    cache=func.__name__,
+                    view=self.canvas_view,
+                    slice=slice_index,
+                )
+                return untraced(self, slice_index, *args)
 
-        def cache_clear():
-            cache.clear()
+        def cache_clear(canvas_view=None):
+            cache.clear(canvas_view)
 
-        def cache_invalidate(slice_index):
-            keys_to_remove = [key for key in cache if key[0] == slice_index]
-            for key in keys_to_remove:
-                del cache[key]
+        def cache_invalidate(slice_index, canvas_view=None):
+            for view in [canvas_view] if canvas_view else list(cache.views):
+                cache.invalidate(view, slice_index)
 
+        wrapper.cache = cache
+        wrapper.cache_key = cache_key
         wrapper.cache_clear = cache_clear
         wrapper.cache_invalidate = cache_invalidate
+        wrapper.cache_info = cache.info
         return wrapper
 
     return decorator
@@ -0,0 +1,106 @@
+# utils/cache_utils/prefetch.py
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+
+class ScrollState:
+    def __init__(self):
+        self.last_index = None
+        self.last_time = None
+        self.direction = 0
+        self.token = 0
+        self.futures = []
+
+
+class SlicePrefetcher:
+    """
+    Predict the next slices of a view from the scroll direction and velocity and
+    render them into a SliceCache on a worker thread pool.
+
+    :param depth: maximum number of slices rendered ahead of the current one
+    :param max_workers: size of the worker thread pool
+    :param lookahead: seconds of scrolling (at the current velocity) to prefetch
+    """
+
+    def __init__(self, depth=8, max_workers=2, lookahead=0.25):
+        self.depth = depth
+        self.lookahead = lookahead
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="slice-prefetch"
+        )
+        self.states = {}
+
+    def predict(self, state, slice_index, num_slices):
+        """Return the slice indices expected next, nearest first."""
+        now = time.perf_counter()
+        step = 0 if state.last_index is None else slice_index - state.last_index
+        elapsed = None if state.last_time is None else now - state.last_time
+        state.last_index, state.last_time = slice_index, now
+
+        if step == 0:
+            return []
+
+        direction = 1 if step > 0 else -1
+        if direction != state.direction:
+            self.cancel(state)
+            state.direction = direction
+
+        # Keep the stride of the scroll (e.g. several slices per wheel notch) and
+        # look further ahead the faster the user scrolls
+        stride = abs(step)
+        count = self.depth
+        if elapsed:
+            velocity = stride / elapsed
+            count = min(self.depth, max(1, int(velocity * self.lookahead / stride)))
+
+        targets = []
+        for i in range(1, count + 1):
+            target = slice_index + direction * stride * i
+            if not 0 <= target < num_slices:
+                break
+            targets.append(target)
+        return targets
+
+    def update(self, view, slice_index, num_slices, cache, cache_key, render):
+        """
+        Schedule prefetching after ``view`` moved to ``slice_index``.
+        :param cache: SliceCache receiving the rendered slices
+        :param cache_key: callable slice_index -> cache key (evaluated on this thread)
+        :param render: callable slice_index -> value, run on a worker thread
+        """
+        state = self.states.setdefault(view, ScrollState())
+        state.futures = [future for future in state.futures if not future.done()]
+
+        for target in self.predict(state, slice_index, num_slices):
+            key = cache_key(target)
+            if cache.peek(key) is not None:
+                continue
+            state.futures.append(
+                self.executor.submit(
+                    self.run, state, state.token, cache, key, render, target
+                )
+            )
+
+    def run(self, state, token, cache, key, render, slice_index):
+        if token != state.token or cache.peek(key) is not None:
+            return
+        value = render(slice_index)
+        # Results of a cancelled (reversed) scroll are dropped
+        if token == state.token:
+            cache.put(key, value)
+
+    def cancel(self, state):
+        state.token += 1
+        for future in state.futures:
+            future.cancel()
+        state.futures = []
+
+    def reset(self):
+        """Cancel everything, e.g. when a new volume is loaded."""
+        for state in self.states.values():
+            self.cancel(state)
+        self.states.clear()
+
+    def shutdown(self):
+        self.reset()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,115 @@
+# utils/cache_utils/slice_cache.py
+from collections import OrderedDict
+from itertools import count
+import threading
+
+_generations = count(1)
+
+
+def next_generation():
+    """Return a new, process-wide unique data generation number."""
+    return next(_generations)
+
+
+def sizeof(value):
+    """Approximate memory footprint of a cached value in bytes."""
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if hasattr(value, "byteCount"):  # QImage
+        return int(value.byteCount())
+    return 0
+
+
+class SliceCache:
+    """
+    Thread-safe LRU cache bounded by a memory budget in bytes.
+
+    Keys are ``(canvas_view, slice_index, generation, args)`` tuples. A
+    secondary index maps ``(canvas_view, slice_index)`` to its keys so that
+    invalidating one slice does not scan the whole cache.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, nbytes)
+        self.slice_index = {}  # (canvas_view, slice_index) -> set of keys
+        self.views = set()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key):
+        """Return a cached value without touching LRU order or counters."""
+        with self.lock:
+            entry = self.entries.get(key)
+            return None if entry is None else entry[0]
+
+    def put(self, key, value):
+        nbytes = sizeof(value)
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            if nbytes > self.max_bytes:
+                return
+            self.entries[key] = (value, nbytes)
+            self.views.add(key[0])
+            self.slice_index.setdefault(key[:2], set()).add(key)
+            self.current_bytes += nbytes
+
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self.remove(oldest)
+                self.evictions += 1
+
+    def remove(self, key):
+        with self.lock:
+            _, nbytes = self.entries.pop(key)
+            self.current_bytes -= nbytes
+            keys = self.slice_index[key[:2]]
+            keys.discard(key)
+            if not keys:
+                del self.slice_index[key[:2]]
+
+    def invalidate(self, canvas_view, slice_index):
+        """Drop every entry of one slice in one view."""
+        with self.lock:
+            for key in self.slice_index.pop((canvas_view, slice_index), ()):
+                _, nbytes = self.entries.pop(key)
+                self.current_bytes -= nbytes
+
+    def clear(self, canvas_view=None):
+        with self.lock:
+            if canvas_view is None:
+                self.entries.clear()
+                self.slice_index.clear()
+                self.current_bytes = 0
+                return
+            for view, slice_index in list(self.slice_index):
+                if view == canvas_view:
+                    self.invalidate(view, slice_index)
+
+    def info(self):
+        """Return hit/miss/eviction counters and memory usage."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
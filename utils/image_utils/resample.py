@@ -0,0 +1,35 @@
+# utils/image_utils/resample.py
+import numpy as np
+
+
+def fit_size(shape, size):
+    """(width, height) of a (rows, cols) image scaled to fit in size, keeping aspect."""
+    height, width = shape
+    scale = min(size[0] / width, size[1] / height)
+    return max(int(round(width * scale)), 1), max(int(round(height * scale)), 1)
+
+
+def linear_weights(output_length, input_length):
+    """Source indices and weights of a pixel-center aligned linear resampling."""
+    positions = (np.arange(output_length) + 0.5) * (input_length / output_length) - 0.5
+    positions = np.clip(positions, 0, input_length - 1)
+    lower = positions.astype(np.intp)
+    upper = np.minimum(lower + 1, input_length - 1)
+    return lower, upper, (positions - lower).astype(np.float32)
+
+
+def resize_bilinear(array, width, height):
+    """
+    Resize a 2D integer array with bilinear interpolation, keeping its dtype.
+    :param array: 2D numpy array
+    :param width: output width
+    :param height: output height
+    """
+    top, bottom, row_weights = linear_weights(height, array.shape[0])
+    left, right, col_weights = linear_weights(width, array.shape[1])
+
+    rows = array[top].astype(np.float32)
+    rows += (array[bottom] - rows) * row_weights[:, None]
+    result = rows[:, left]
+    result += (rows[:, right] - result) * col_weights[None, :]
+    return np.rint(result).astype(array.dtype)
@@ -0,0 +1,55 @@
+# utils/image_utils/window_level.py
+import numpy as np
+
+# Number of intensity levels a display LUT resolves
+LUT_SIZE = 65536
+
+# Common CT windows as (width, level) in Hounsfield units
+WINDOW_PRESETS = {
+    "Brain": (80, 40),
+    "Subdural": (250, 80),
+    "Lung": (1500, -600),
+    "Mediastinum": (350, 50),
+    "Abdomen": (400, 40),
+    "Liver": (150, 30),
+    "Bone": (2000, 300),
+}
+
+
+def intensity_mapping(min_value, max_value, integer=False):
+    """
+    Map the intensity range of a volume onto LUT indices.
+    Integer data whose range fits in the LUT is indexed by its values directly.
+    :return: (offset, scale) with index = (value - offset) * scale
+    """
+    value_range = float(max_value) - float(min_value)
+    if integer and value_range < LUT_SIZE:
+        return float(min_value), 1.0
+    if value_range <= 0:
+        return float(min_value), 1.0
+    return float(min_value), (LUT_SIZE - 1) / value_range
+
+
+def to_lut_indices(image_data, offset, scale):
+    """Convert a slice of intensities to uint16 LUT indices."""
+    if scale == 1.0 and image_data.dtype.kind in "iu":
+        indices = image_data.astype(np.int64) - int(offset)
+    else:
+        indices = np.rint((image_data.astype(np.float32) - offset) * scale)
+    return np.clip(indices, 0, LUT_SIZE - 1).astype(np.uint16)
+
+
+def build_window_lut(width, level, offset, scale):
+    """
+    Gray value of every LUT index for a window/level.
+    :return: uint8 array of LUT_SIZE entries
+    """
+    values = offset + np.arange(LUT_SIZE, dtype=np.float64) / scale
+    low = level - width / 2.0
+    gray = (values - low) * (255.0 / max(width, 1e-6))
+    return np.clip(np.rint(gray), 0, 255).astype(np.uint8)
+
+
+def window_from_range(low, high):
+    """(width, level) of the window showing [low, high] from black to white."""
+    return float(high) - float(low), (float(high) + float(low)) / 2.0
@@ -1,68 +1,190 @@
 # utils/segmentation_utils/drawing_segmentation.py
-from PyQt5.QtCore import Qt
-from scipy.ndimage import zoom
+from collections import namedtuple
+
 import numpy as np
 
+# Result of one brush stroke segment: the half-open (y_min, x_min, y_max, x_max)
+# box it touched, a boolean mask of the painted pixels inside that box and the
+# values of the box before painting
+StrokeRegion = namedtuple("StrokeRegion", ["bounding_box", "mask", "old_values"])
+
+
+# Default label colors (R, G, B); label 0 is always transparent
+DEFAULT_PALETTE = {
+    1: (255, 0, 0),  # Red
+    2: (0, 255, 0),  # Green
+    3: (0, 0, 255),  # Blue
+    4: (255, 255, 0),  # Yellow
+    5: (135, 206, 235),  # Sky Blue
+    6: (128, 0, 128),  # Purple
+}
+
+MAX_LABEL_VALUE = np.iinfo(np.uint16).max
+
+
+def build_label_lut(palette=None, opacity=1.0):
+    """
+    Build a label -> ARGB32 lookup table.
+    :param palette: dict of label value -> (R, G, B) or (R, G, B, A)
+    :param opacity: global opacity multiplier in [0, 1]
+    :return: 1D uint32 array; the last entry is transparent and absorbs labels
+             outside the palette range
+    """
+    if palette is None:
+        palette = DEFAULT_PALETTE
+
+    max_label = max((int(label) for label in palette), default=0)
+    if max_label > MAX_LABEL_VALUE:
+        raise ValueError(f"Label values must be <= {MAX_LABEL_VALUE}")
 
-def bresenham_line(x0, y0, x1, y1):
-    points = []
-    dx = abs(x1 - x0)
-    dy = abs(y1 - y0)
-    sx = 1 if x0 < x1 else -1
-    sy = 1 if y0 < y1 else -1
-    err = dx - dy
+    lut = np.zeros(max_label + 2, dtype=np.uint32)
+    for label, color in palette.items():
+        if int(label) <= 0:
+            continue
+        r, g, b = color[:3]
+        a = color[3] if len(color) > 3 else 255
+        a = int(round(np.clip(a * opacity, 0, 255)))
+        lut[int(label)] = (a << 24) | (r << 16) | (g << 8) | b
+    return lut
 
-    while True:
-        points.append((x0, y0))
-        if x0 == x1 and y0 == y1:
-            break
-        e2 = err * 2
-        if e2 > -dy:
-            err -= dy
-            x0 += sx
-        if e2 < dx:
-            err += dx
-            y0 += sy
 
-    return points
+def nearest_indices(output_length, input_length, start=0, stop=None):
+    """
+    Source indices for nearest-neighbour resampling of [start, stop) output pixels.
+    """
+    if stop is None:
+        stop = output_length
+    positions = np.arange(start, stop, dtype=np.int64)
+    return np.minimum(positions * input_length // output_length, input_length - 1)
+
 
+def qimage_as_argb32_array(image):
+    """Expose the pixels of a Format_ARGB32 QImage as a writable (h, w) uint32 array."""
+    buffer = image.bits()
+    buffer.setsize(image.byteCount())
+    return np.frombuffer(buffer, np.uint32).reshape(
+        (image.height(), image.bytesPerLine() // 4)
+    )[:, : image.width()]
 
-def render_segmentation_from_matrix(segmentation_image, slice_segmentation, view):
+
+def render_segmentation_region(
+    segmentation_image, slice_segmentation, bounding_box, label_lut=None
+):
     """
-    Render the segmentations for faster performance.
-    :param segmentation_image: QImage object to draw the segmentation
+    Re-render only the part of an already rendered segmentation image that
+    shows the given region of the slice.
+    :param segmentation_image: Format_ARGB32 QImage previously filled by
+                               render_segmentation_from_matrix
+    :param slice_segmentation: 2D numpy array of the segmentation of one slice
+    :param bounding_box: (y_min, x_min, y_max, x_max) half-open region of the slice
+    :param label_lut: uint32 lookup table from build_label_lut (default palette if None)
+    :return: (x, y, width, height) of the updated area in image pixels
+    """
+    if label_lut is None:
+        label_lut = build_label_lut()
+
+    height, width = slice_segmentation.shape
+    image_height, image_width = segmentation_image.height(), segmentation_image.width()
+    y_min, x_min, y_max, x_max = bounding_box
+
+    # Output pixels whose nearest source pixel falls inside the bounding box
+    row_start = -(-y_min * image_height // height)
+    row_stop = -(-y_max * image_height // height)
+    col_start = -(-x_min * image_width // width)
+    col_stop = -(-x_max * image_width // width)
+    if row_start >= row_stop or col_start >= col_stop:
+        return (col_start, row_start, 0, 0)
+
+    rows = nearest_indices(image_height, height, row_start, row_stop)
+    cols = nearest_indices(image_width, width, col_start, col_stop)
+    img_array = qimage_as_argb32_array(segmentation_image)
+    img_array[row_start:row_stop, col_start:col_stop] = label_lut.take(
+        slice_segmentation[rows[:, None], cols[None, :]], mode="clip"
+    )
+    return (col_start, row_start, col_stop - col_start, row_stop - row_start)
+
+
+def render_segmentation_from_matrix(
+    segmentation_image, slice_segmentation, view, label_lut=None
+):
+    """
+    Render the segmentations with a single palette lookup per output pixel.
+    :param segmentation_image: Format_ARGB32 QImage object to draw the segmentation
     :param slice_segmentation: 2D numpy array containing segmentation data for a specific slice
     :param view: current canvas view type ('axial', 'coronal', 'sagittal')
+    :param label_lut: uint32 lookup table from build_label_lut (default palette if None)
     """
-    if slice_segmentation is not None:
-        segmentation_image.fill(Qt.transparent)
-        height, width = slice_segmentation.shape
-
-        color_map = {
-            1: (0, 0, 255, 255),  # Red
-            2: (0, 255, 0, 255),  # Green
-            3: (255, 0, 0, 255),  # Blue
-            4: (255, 255, 0, 255),  # Yellow
-            5: (135, 206, 235, 255),  # Sky Blue
-            6: (128, 0, 128, 255),  # Purple
-        }
-
-        buffer = segmentation_image.bits()
-        buffer.setsize(segmentation_image.byteCount())
-        img_array = np.frombuffer(buffer, np.uint8).reshape(
-            (segmentation_image.height(), segmentation_image.width(), 4)
+    if slice_segmentation is None:
+        return
+
+    if label_lut is None:
+        label_lut = build_label_lut()
+
+    height, width = slice_segmentation.shape
+    img_array = qimage_as_argb32_array(segmentation_image)
+
+    # Nearest-neighbour upsampling by index mapping, then one LUT gather
+    rows = nearest_indices(segmentation_image.height(), height)
+    cols = nearest_indices(segmentation_image.width(), width)
+    label_lut.take(
+        slice_segmentation[rows[:, None], cols[None, :]], out=img_array, mode="clip"
+    )
+
+
+def to_matrix_coordinates(point, matrix_shape, background_image):
+    """
+    Convert a QPoint on the background image to clipped (x, y) matrix indices.
+    """
+    x = int(
+        np.clip(
+            point.x() * matrix_shape[1] / background_image.width(),
+            0,
+            matrix_shape[1] - 1,
+        )
+    )
+    y = int(
+        np.clip(
+            point.y() * matrix_shape[0] / background_image.height(),
+            0,
+            matrix_shape[0] - 1,
         )
+    )
+    return x, y
+
 
-        scale_x = segmentation_image.width() / width
-        scale_y = segmentation_image.height() / height
+def stroke_bounding_box(matrix_shape, x0, y0, x1, y1, brush_radius):
+    """
+    Bounding box of a brush segment from (x0, y0) to (x1, y1) in matrix coordinates.
+    :return: (y_min, x_min, y_max, x_max) half-open, clipped to the matrix
+    """
+    return (
+        max(min(y0, y1) - brush_radius, 0),
+        max(min(x0, x1) - brush_radius, 0),
+        min(max(y0, y1) + brush_radius + 1, matrix_shape[0]),
+        min(max(x0, x1) + brush_radius + 1, matrix_shape[1]),
+    )
+
+
+def stroke_mask(bounding_box, x0, y0, x1, y1, brush_radius):
+    """
+    Rasterize a brush segment as a capsule (swept disk) inside its bounding box.
+    :return: boolean mask of shape (y_max - y_min, x_max - x_min)
+    """
+    y_min, x_min, y_max, x_max = bounding_box
+    Y, X = np.ogrid[y_min:y_max, x_min:x_max]
+    dx, dy = x1 - x0, y1 - y0
+    length_sq = dx * dx + dy * dy
 
-        for color_value, color in color_map.items():
-            positions = np.argwhere(slice_segmentation == color_value)
-            if len(positions) > 0:
-                mask = np.zeros((height, width), dtype=np.uint8)
-                mask[positions[:, 0], positions[:, 1]] = 1
-                zoomed_mask = zoom(mask, (scale_y, scale_x), order=1)
-                img_array[zoomed_mask > 0.5] = color
+    # Distance from every pixel to the closest point of the segment
+    if length_sq == 0:
+        t = 0.0
+    else:
+        t = np.clip(((X - x0) * dx + (Y - y0) * dy) / length_sq, 0.0, 1.0)
+    dist_x = X - (x0 + t * dx)
+    dist_y = Y - (y0 + t * dy)
+
+    # A 1px brush still has to produce a connected line
+    return dist_x * dist_x + dist_y * dist_y <= max(brush_radius**2, 0.25)
 
 
 def update_segmentation_matrix(
@@ -74,81 +196,34 @@ def update_segmentation_matrix(
     brush_color_value,
 ):
     """
-    Update the segmentation matrix by drawing a line between points.
+    Update the segmentation matrix by stamping the brush along a line between points.
     :param segmentation_matrix: 2D numpy array to update with segmentation
     :param last_pos: QPoint for the starting point
     :param pos: QPoint for the ending point
     :param brush_size: Brush size in pixels
     :param background_image: QImage object for the background image
     :param brush_color_value: Integer for the color value of the brush
+    :return: StrokeRegion with the bounding box, mask and previous values of the
+             painted pixels
     """
     if segmentation_matrix is None:
         return
 
     # Convert positions to matrix coordinates
-    x0 = int(
-        np.clip(
-            last_pos.x() * segmentation_matrix.shape[1] / background_image.width(),
-            0,
-            segmentation_matrix.shape[1] - 1,
-        )
-    )
-    y0 = int(
-        np.clip(
-            last_pos.y() * segmentation_matrix.shape[0] / background_image.height(),
-            0,
-            segmentation_matrix.shape[0] - 1,
-        )
+    x0, y0 = to_matrix_coordinates(
+        last_pos, segmentation_matrix.shape, background_image
     )
-    x1 = int(
-        np.clip(
-            pos.x() * segmentation_matrix.shape[1] / background_image.width(),
-            0,
-            segmentation_matrix.shape[1] - 1,
-        )
-    )
-    y1 = int(
-        np.clip(
-            pos.y() * segmentation_matrix.shape[0] / background_image.height(),
-            0,
-            segmentation_matrix.shape[0] - 1,
-        )
-    )
-
-    # Generate points using Bresenham's algorithm
-    line_points = bresenham_line(x0, y0, x1, y1)
+    x1, y1 = to_matrix_coordinates(pos, segmentation_matrix.shape, background_image)
 
-    # Prepare a mask to define brush effect area
     brush_radius = brush_size // 2
-    Y, X = np.ogrid[-brush_radius : brush_radius + 1, -brush_radius : brush_radius + 1]
-    mask = X**2 + Y**2 <= brush_radius**2
-
-    updated_pixels = set()  # For Update Cache
-
-    for x_center, y_center in line_points:
-        x_min = max(x_center - brush_radius, 0)
-        x_max = min(x_center + brush_radius + 1, segmentation_matrix.shape[1])
-        y_min = max(y_center - brush_radius, 0)
-        y_max = min(y_center + brush_radius + 1, segmentation_matrix.shape[0])
-
-        sub_matrix = segmentation_matrix[y_min:y_max, x_min:x_max]
-
-        mask_x_start = max(0, -x_center + brush_radius)
-        mask_x_end = mask_x_start + (x_max - x_min)
-        mask_y_start = max(0, -y_center + brush_radius)
-        mask_y_end = mask_y_start + (y_max - y_min)
-
-        mask_area = mask[mask_y_start:mask_y_end, mask_x_start:mask_x_end]
-
-        if brush_color_value == 0:
-            sub_matrix[mask_area] = 0
-        else:
-            sub_matrix[mask_area] = int(brush_color_value)
-
-        dy_indices, dx_indices = np.nonzero(mask_area)
-        y_indices = y_min + dy_indices
-        x_indices = x_min + dx_indices
+    bounding_box = stroke_bounding_box(
+        segmentation_matrix.shape, x0, y0, x1, y1, brush_radius
+    )
+    mask = stroke_mask(bounding_box, x0, y0, x1, y1, brush_radius)
 
-        updated_pixels.update(zip(y_indices, x_indices))
+    y_min, x_min, y_max, x_max = bounding_box
+    sub_matrix = segmentation_matrix[y_min:y_max, x_min:x_max]
+    old_values = sub_matrix.copy()
+    sub_matrix[mask] = int(brush_color_value)
 
-    return updated_pixels
+    return StrokeRegion(bounding_box, mask, old_values)
@@ -0,0 +1,149 @@
+# utils/segmentation_utils/history.py
+import zlib
+
+import numpy as np
+
+
+def compress_array(array):
+    return zlib.compress(np.ascontiguousarray(array).tobytes(), 1)
+
+
+def decompress_array(data, dtype, shape):
+    return np.frombuffer(zlib.decompress(data), dtype=dtype).reshape(shape)
+
+
+class SlicePatch:
+    """
+    Old and new label values of a rectangular region of one view slice.
+    """
+
+    def __init__(self, canvas_view, slice_index, bounding_box, old_values, new_values):
+        self.canvas_view = canvas_view
+        self.slice_index = slice_index
+        self.bounding_box = bounding_box
+        self.dtype = old_values.dtype
+        self.shape = old_values.shape
+        self.old_values = compress_array(old_values)
+        self.new_values = compress_array(new_values)
+        self.nbytes = len(self.old_values) + len(self.new_values)
+
+    def apply(self, segmentation_store, accessors, undo):
+        """
+        Write the old (undo) or new (redo) values back.
+        :return: 3D volume box that changed
+        """
+        accessor = accessors[self.canvas_view]
+        y_min, x_min, y_max, x_max = self.bounding_box
+        rows, cols = (y_min, y_max), (x_min, x_max)
+        values = decompress_array(
+            self.old_values if undo else self.new_values, self.dtype, self.shape
+        )
+        accessor.write_slice(self.slice_index, values, rows, cols)
+        return accessor.volume_box(self.slice_index, rows, cols)
+
+    def transition(self, undo):
+        """:return: (values before, values after) applying the patch"""
+        old_values = decompress_array(self.old_values, self.dtype, self.shape)
+        new_values = decompress_array(self.new_values, self.dtype, self.shape)
+        return (new_values, old_values) if undo else (old_values, new_values)
+
+
+class ClearPatch:
+    """
+    Every labelled voxel of the volume before a "Clear All", stored sparsely.
+    """
+
+    def __init__(self, segmentation_store):
+        indices, values = segmentation_store.nonzero_voxels()
+        self.dtype = values.dtype
+        self.index_dtype = indices.dtype
+        self.indices = compress_array(indices)
+        self.values = compress_array(values)
+        self.nbytes = len(self.indices) + len(self.values)
+
+    def apply(self, segmentation_store, accessors, undo):
+        """
+        Restore (undo) or clear (redo) the labelled voxels.
+        :return: None, meaning every slice may have changed
+        """
+        indices = decompress_array(self.indices, self.index_dtype, (-1,))
+        if undo:
+            values = decompress_array(self.values, self.dtype, (-1,))
+        else:
+            values = np.zeros(len(indices), dtype=self.dtype)
+        segmentation_store.set_voxels(indices, values)
+        return None
+
+    def transition(self, undo):
+        """:return: (values before, values after) of the labelled voxels"""
+        values = decompress_array(self.values, self.dtype, (-1,))
+        zeros = np.zeros(len(values), dtype=self.dtype)
+        return (zeros, values) if undo else (values, zeros)
+
+
+class SegmentationHistory:
+    """
+    Undo/redo stacks of label edits. One entry is a list of patches (e.g. all
+    the segments of one brush stroke). The oldest entries are dropped once the
+    compressed size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.undo_stack = []
+        self.redo_stack = []
+        self.open_entry = None
+        self.current_bytes = 0
+
+    def record(self, patch):
+        """Add a patch to the current entry, starting one if needed."""
+        if self.open_entry is None:
+            self.open_entry = []
+            self.undo_stack.append(self.open_entry)
+            self.discard_redo()
+        self.open_entry.append(patch)
+        self.current_bytes += patch.nbytes
+        self.enforce_limit()
+
+    def record_entry(self, patch):
+        """Record a patch as an entry of its own."""
+        self.end_entry()
+        self.record(patch)
+        self.end_entry()
+
+    def end_entry(self):
+        self.open_entry = None
+
+    def undo(self):
+        """Pop the latest entry; its patches must be applied in reverse order."""
+        self.end_entry()
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        self.redo_stack.append(entry)
+        return reversed(entry)
+
+    def redo(self):
+        self.end_entry()
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        self.undo_stack.append(entry)
+        return entry
+
+    def discard_redo(self):
+        for entry in self.redo_stack:
+            self.current_bytes -= sum(patch.nbytes for patch in entry)
+        self.redo_stack = []
+
+    def enforce_limit(self):
+        # Never evict the entry that is being recorded
+        while self.current_bytes > self.max_bytes and len(self.undo_stack) > 1:
+            entry = self.undo_stack.pop(0)
+            self.current_bytes -= sum(patch.nbytes for patch in entry)
+
+    def clear(self):
+        self.undo_stack = []
+        self.redo_stack = []
+        self.open_entry = None
+        self.current_bytes = 0
@@ -0,0 +1,60 @@
+# utils/segmentation_utils/label_stats.py
+import numpy as np
+
+
+class LabelStatistics:
+    """
+    Voxel count of every label value, kept up to date from the old and new
+    values of each edit so reading it never scans the volume.
+    """
+
+    def __init__(self, num_voxels=0):
+        self.counts = np.array([num_voxels], dtype=np.int64)  # index = label
+
+    @classmethod
+    def from_store(cls, segmentation_store):
+        """Count a label store once (only allocated blocks for sparse stores)."""
+        stats = cls()
+        stats.counts = segmentation_store.label_counts()
+        return stats
+
+    @property
+    def num_voxels(self):
+        return int(self.counts.sum())
+
+    def add_counts(self, values, sign):
+        counts = np.bincount(values)
+        if len(counts) > len(self.counts):
+            self.counts = np.pad(self.counts, (0, len(counts) - len(self.counts)))
+        self.counts[: len(counts)] += sign * counts
+
+    def update(self, old_values, new_values):
+        """
+        Account for an edit.
+        :param old_values: label values of a region before the edit
+        :param new_values: label values of the same region after the edit
+        """
+        changed = old_values != new_values
+        if not changed.any():
+            return
+        self.add_counts(old_values[changed], -1)
+        self.add_counts(new_values[changed], 1)
+
+    def clear(self):
+        self.counts = np.array([self.num_voxels], dtype=np.int64)
+
+    def voxel_counts(self):
+        """:return: {label: voxel count} of every non-zero label present"""
+        return {
+            label: int(count)
+            for label, count in enumerate(self.counts)
+            if label and count
+        }
+
+    def volumes_ml(self, spacing):
+        """
+        :param spacing: voxel size in mm along each axis
+        :return: {label: volume in mL} of every non-zero label present
+        """
+        voxel_ml = float(np.prod(spacing)) / 1000.0
+        return {label: count * voxel_ml for label, count in self.voxel_counts().items()}
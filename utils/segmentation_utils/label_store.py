@@ -0,0 +1,344 @@
+# utils/segmentation_utils/label_store.py
+from itertools import product
+
+import numpy as np
+
+BLOCK_SIZE = 32
+
+
+def label_dtype(max_label):
+    """Smallest unsigned dtype that holds label values up to max_label."""
+    return (
+        np.dtype(np.uint8)
+        if max_label <= np.iinfo(np.uint8).max
+        else np.dtype(np.uint16)
+    )
+
+
+def create_label_store(shape, max_label=255, sparse=True):
+    """
+    Create an empty label volume.
+    :param shape: 3D shape of the (canonical) image volume
+    :param max_label: largest label value that has to fit in the store
+    :param sparse: allocate 32^3 blocks only when they are painted
+    """
+    dtype = label_dtype(max_label)
+    if sparse:
+        return BlockSparseLabelStore(shape, dtype)
+    return DenseLabelStore(shape, dtype)
+
+
+def normalize_key(key, shape):
+    """
+    Turn a basic index (ints and unit-step slices) into per-axis (start, stop)
+    ranges plus the axes indexed by an integer.
+    """
+    if not isinstance(key, tuple):
+        key = (key,)
+    if Ellipsis in key:
+        position = key.index(Ellipsis)
+        key = (
+            key[:position]
+            + (slice(None),) * (len(shape) - len(key) + 1)
+            + key[position + 1 :]
+        )
+    key = key + (slice(None),) * (len(shape) - len(key))
+
+    ranges, int_axes = [], []
+    for axis, (item, length) in enumerate(zip(key, shape)):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(length)
+            if step != 1:
+                raise IndexError("Label stores only support unit-step slices")
+            ranges.append((start, max(start, stop)))
+        else:
+            index = int(item)
+            if index < 0:
+                index += length
+            if not 0 <= index < length:
+                raise IndexError(f"Index {item} out of range for axis {axis}")
+            ranges.append((index, index + 1))
+            int_axes.append(axis)
+    return ranges, tuple(int_axes)
+
+
+class DenseLabelStore:
+    """
+    Label volume backed by one compact (uint8/uint16) array.
+    """
+
+    def __init__(self, shape, dtype=np.uint8):
+        self.array = np.zeros(shape, dtype=dtype)
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    @property
+    def dtype(self):
+        return self.array.dtype
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes
+
+    def __getitem__(self, key):
+        return self.array[key]
+
+    def __setitem__(self, key, value):
+        self.array[key] = value
+
+    def __array__(self, dtype=None, copy=None):
+        return self.to_array() if dtype is None else self.to_array().astype(dtype)
+
+    def to_array(self):
+        return self.array
+
+    def is_empty(self):
+        return not self.array.any()
+
+    def clear(self):
+        self.array.fill(0)
+
+    def astype(self, dtype):
+        """Copy of the store with another label dtype."""
+        converted = DenseLabelStore.__new__(DenseLabelStore)
+        converted.array = self.array.astype(dtype)
+        return converted
+
+    def snapshot(self):
+        """Read-only copy of the current labels (a plain copy for dense storage)."""
+        snapshot = DenseLabelStore.__new__(DenseLabelStore)
+        snapshot.array = self.array.copy()
+        return snapshot
+
+    def nonzero_voxels(self):
+        """Return (flat indices, values) of every labelled voxel."""
+        flat = self.array.reshape(-1)
+        indices = np.flatnonzero(flat)
+        return indices, flat[indices]
+
+    def label_counts(self):
+        """Voxel count of every label value (index = label)."""
+        return np.bincount(self.array.reshape(-1)).astype(np.int64)
+
+    def slice_counts(self):
+        """Labelled voxels per slice along each axis, as three arrays."""
+        labelled = self.array != 0
+        return [
+            labelled.sum(axis=tuple(other for other in range(3) if other != axis))
+            for axis in range(3)
+        ]
+
+    def labelled_blocks(self, block_size=BLOCK_SIZE):
+        """Yield (start, values) of every block_size^3 block holding a label."""
+        for start in product(*(range(0, length, block_size) for length in self.shape)):
+            key = tuple(slice(bound, bound + block_size) for bound in start)
+            values = self.array[key]
+            if values.any():
+                yield start, values
+
+    def set_voxels(self, indices, values):
+        self.array.reshape(-1)[indices] = values
+
+
+class BlockSparseLabelStore:
+    """
+    Label volume split into BLOCK_SIZE^3 blocks that are only allocated once a
+    non-zero label is written into them. Supports basic numpy indexing with
+    integers and unit-step slices.
+    """
+
+    def __init__(self, shape, dtype=np.uint8, block_size=BLOCK_SIZE):
+        self.shape = tuple(int(length) for length in shape)
+        self.dtype = np.dtype(dtype)
+        self.block_size = block_size
+        self.blocks = {}  # (bx, by, bz) -> ndarray of shape (block_size,) * 3
+        self.shared_blocks = set()  # blocks still referenced by a snapshot
+
+    @property
+    def nbytes(self):
+        return len(self.blocks) * self.block_size**3 * self.dtype.itemsize
+
+    def block_ranges(self, ranges):
+        """Yield (block key, block-local slicer, output slicer) for a box."""
+        size = self.block_size
+        per_axis = []
+        for start, stop in ranges:
+            if stop <= start:
+                return
+            axis_blocks = []
+            for block in range(start // size, (stop - 1) // size + 1):
+                lo = max(start, block * size)
+                hi = min(stop, (block + 1) * size)
+                axis_blocks.append(
+                    (
+                        block,
+                        slice(lo - block * size, hi - block * size),
+                        slice(lo - start, hi - start),
+                    )
+                )
+            per_axis.append(axis_blocks)
+
+        for combination in product(*per_axis):
+            key = tuple(item[0] for item in combination)
+            yield key, tuple(item[1] for item in combination), tuple(
+                item[2] for item in combination
+            )
+
+    def __getitem__(self, key):
+        ranges, int_axes = normalize_key(key, self.shape)
+        out = np.zeros([stop - start for start, stop in ranges], dtype=self.dtype)
+        if self.blocks:
+            for block_key, block_slicer, out_slicer in self.block_ranges(ranges):
+                block = self.blocks.get(block_key)
+                if block is not None:
+                    out[out_slicer] = block[block_slicer]
+        return out.squeeze(axis=int_axes) if int_axes else out
+
+    def __setitem__(self, key, value):
+        ranges, int_axes = normalize_key(key, self.shape)
+        box_shape = [stop - start for start, stop in ranges]
+        value = np.asarray(value)
+        if int_axes and value.ndim == len(box_shape) - len(int_axes):
+            value = np.expand_dims(value, int_axes)
+        value = np.broadcast_to(value, box_shape)
+
+        for block_key, block_slicer, value_slicer in self.block_ranges(ranges):
+            sub_value = value[value_slicer]
+            has_labels = sub_value.any()
+            block = self.writable_block(block_key)
+            if block is None:
+                if not has_labels:
+                    continue
+                block = self.allocate_block(block_key)
+            block[block_slicer] = sub_value
+            # Release blocks that were erased completely
+            if not has_labels and not block.any():
+                del self.blocks[block_key]
+
+    def writable_block(self, block_key):
+        """Return a block for writing, copying it first if a snapshot shares it."""
+        block = self.blocks.get(block_key)
+        if block is not None and block_key in self.shared_blocks:
+            block = block.copy()
+            self.blocks[block_key] = block
+            self.shared_blocks.discard(block_key)
+        return block
+
+    def allocate_block(self, block_key):
+        block = np.zeros((self.block_size,) * 3, dtype=self.dtype)
+        self.blocks[block_key] = block
+        return block
+
+    def __array__(self, dtype=None, copy=None):
+        return self.to_array() if dtype is None else self.to_array().astype(dtype)
+
+    def to_array(self):
+        """Materialize the full dense volume."""
+        return self[:, :, :]
+
+    def is_empty(self):
+        return not self.blocks
+
+    def clear(self):
+        self.blocks = {}
+        self.shared_blocks = set()
+
+    def astype(self, dtype):
+        """Copy of the store with another label dtype."""
+        converted = BlockSparseLabelStore(self.shape, dtype, self.block_size)
+        converted.blocks = {
+            key: block.astype(dtype) for key, block in self.blocks.items()
+        }
+        return converted
+
+    def snapshot(self):
+        """
+        Read-only copy of the current labels that shares every block with this
+        store; a block is only copied when it is written here afterwards.
+        """
+        snapshot = BlockSparseLabelStore(self.shape, self.dtype, self.block_size)
+        snapshot.blocks = dict(self.blocks)
+        self.shared_blocks = set(self.blocks)
+        return snapshot
+
+    def nonzero_voxels(self):
+        """Return (flat indices, values) of every labelled voxel."""
+        size = self.block_size
+        all_indices, all_values = [], []
+        for block_key, block in self.blocks.items():
+            local = np.nonzero(block)
+            coords = [local[axis] + block_key[axis] * size for axis in range(3)]
+            all_indices.append(np.ravel_multi_index(coords, self.shape))
+            all_values.append(block[local])
+        if not all_indices:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=self.dtype)
+        return np.concatenate(all_indices), np.concatenate(all_values)
+
+    def labelled_blocks(self):
+        """Yield (start, values) of every labelled block, cropped to the volume."""
+        for block_key, block in self.blocks.items():
+            if not block.any():
+                continue
+            start = tuple(index * self.block_size for index in block_key)
+            yield start, block[
+                tuple(
+                    slice(0, length - bound) for bound, length in zip(start, self.shape)
+                )
+            ]
+
+    def label_counts(self):
+        """Voxel count of every label value (index = label), from allocated blocks."""
+        counts = np.zeros(1, dtype=np.int64)
+        for block in self.blocks.values():
+            block_counts = np.bincount(block.reshape(-1))
+            if len(block_counts) > len(counts):
+                counts = np.pad(counts, (0, len(block_counts) - len(counts)))
+            counts[: len(block_counts)] += block_counts
+        # Unallocated blocks and the padding of edge blocks are background
+        counts[0] = int(np.prod(self.shape)) - counts[1:].sum()
+        return counts
+
+    def slice_counts(self):
+        """Labelled voxels per slice along each axis, from the allocated blocks only."""
+        counts = [np.zeros(length, dtype=np.int64) for length in self.shape]
+        for block_key, block in self.blocks.items():
+            labelled = block != 0
+            for axis in range(3):
+                start = block_key[axis] * self.block_size
+                block_counts = labelled.sum(
+                    axis=tuple(other for other in range(3) if other != axis)
+                )
+                # Edge blocks extend past the volume; their padding is never labelled
+                counts[axis][start : start + self.block_size] += block_counts[
+                    : self.shape[axis] - start
+                ]
+        return counts
+
+    def set_voxels(self, indices, values):
+        if len(indices) == 0:
+            return
+        size = self.block_size
+        coords = np.unravel_index(indices, self.shape)
+        grid = tuple(-(-length // size) for length in self.shape)
+        block_ids = np.ravel_multi_index(tuple(coord // size for coord in coords), grid)
+        values = np.broadcast_to(values, np.shape(indices))
+
+        # Group the voxels by 1D block id with one sort instead of a scan per block
+        order = np.argsort(block_ids, kind="stable")
+        sorted_ids = block_ids[order]
+        starts = np.flatnonzero(np.diff(sorted_ids, prepend=-1))
+        stops = np.append(starts[1:], len(sorted_ids))
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            block_key = tuple(
+                int(axis) for axis in np.unravel_index(sorted_ids[start], grid)
+            )
+            selected = order[start:stop]
+            block_values = values[selected]
+            block = self.writable_block(block_key)
+            if block is None:
+                if not block_values.any():
+                    continue
+                block = self.allocate_block(block_key)
+            block[tuple(coord[selected] % size for coord in coords)] = block_values
@@ -0,0 +1,137 @@
+# utils/segmentation_utils/load_segmentation.py
+import nibabel as nib
+from nibabel.orientations import apply_orientation, inv_ornt_aff, io_orientation
+import numpy as np
+
+from utils.segmentation_utils.label_store import create_label_store, label_dtype
+
+# Slices along the last axis decoded per chunk
+LOAD_CHUNK_SLICES = 8
+
+# Largest difference (mm) between the segmentation and image affines
+AFFINE_TOLERANCE = 1e-2
+
+# Largest difference between the direction cosines of the two affines
+DIRECTION_TOLERANCE = 1e-3
+
+
+def to_labels(values, dtype):
+    """Cast decoded label values to an integer label dtype (rounding float files)."""
+    if values.dtype.kind == "f":
+        values = np.rint(values)
+    if values.dtype.kind in "iuf":
+        values = np.clip(values, 0, np.iinfo(dtype).max)
+    return values.astype(dtype, copy=False)
+
+
+def canonical_shape(image):
+    """Shape an image gets in canonical (RAS) orientation, from its header alone."""
+    shape = [0, 0, 0]
+    for raw_axis, (canonical_axis, _) in enumerate(io_orientation(image.affine)):
+        shape[int(canonical_axis)] = image.shape[raw_axis]
+    return tuple(shape)
+
+
+def read_canonical_labels(image):
+    """Decode a whole label image into a compact integer array, canonically oriented."""
+    values = np.asanyarray(image.dataobj)
+    while values.ndim > 3 and values.shape[-1] == 1:
+        values = values[..., 0]
+    max_label = int(np.nanmax(values)) if values.size else 0
+    labels = to_labels(values, label_dtype(max_label))
+    return apply_orientation(labels, io_orientation(image.affine))
+
+
+def canonical_affine(affine, shape):
+    """Affine of an image after reorienting it to canonical (RAS) orientation."""
+    ornt = io_orientation(affine)
+    return affine @ inv_ornt_aff(ornt, shape)
+
+
+def direction_cosines(affine):
+    """Unit column vectors of the linear part of an affine."""
+    linear = affine[:3, :3]
+    return linear / np.linalg.norm(linear, axis=0)
+
+
+def check_segmentation_header(image, shape, affine):
+    """
+    Validate a label image against the canonical shape and affine of the
+    current image using its header only. Earlier versions saved an
+    orthogonalized affine without the voxel sizes, so a spacing or origin
+    mismatch is only reported, not rejected.
+    :param image: nibabel image (its data is not read)
+    :param shape: canonical shape of the current image
+    :param affine: canonical affine of the current image
+    :raise ValueError: on a shape or orientation mismatch
+    """
+    if len(image.shape) < 3 or any(length != 1 for length in image.shape[3:]):
+        raise ValueError(f"Expected a 3D segmentation, got shape {image.shape}")
+    if canonical_shape(image) != tuple(shape):
+        raise ValueError(
+            "The dimensions of the segmentation file do not match the current Image."
+        )
+    segmentation_affine = canonical_affine(image.affine, image.shape[:3])
+    if not np.allclose(
+        direction_cosines(segmentation_affine),
+        direction_cosines(affine),
+        atol=DIRECTION_TOLERANCE,
+    ):
+        raise ValueError(
+            "The orientation of the segmentation file does not match the current Image."
+        )
+    if not np.allclose(segmentation_affine, affine, atol=AFFINE_TOLERANCE):
+        print(
+            "Warning: The voxel spacing or position of the segmentation file does "
+            "not match the current Image."
+        )
+
+
+def read_segmentation(
+    file_path,
+    shape,
+    affine,
+    max_label=255,
+    sparse=True,
+    progress_callback=None,
+    cancel_check=None,
+):
+    """
+    Decode a label file slab by slab straight into a canonical label store.
+    The header is validated before any voxel data is read.
+    :param shape: canonical shape of the current image
+    :param affine: canonical affine of the current image
+    :param max_label: initial label capacity; the store widens for larger labels
+    :return: label store
+    """
+    # Keep the file open so gzip'd slabs are inflated in one forward pass
+    image = nib.load(file_path, keep_file_open=True)
+    check_segmentation_header(image, shape, affine)
+
+    ornt = io_orientation(image.affine)
+    slab_axis, slab_flip = int(ornt[2, 0]), ornt[2, 1] < 0
+    total = image.shape[2]
+
+    segmentation_store = create_label_store(shape, max_label, sparse)
+    for start in range(0, total, LOAD_CHUNK_SLICES):
+        if cancel_check is not None:
+            cancel_check()
+        stop = min(start + LOAD_CHUNK_SLICES, total)
+        slab = np.asarray(image.dataobj[:, :, start:stop])
+        slab = apply_orientation(slab.reshape(slab.shape[:3]), ornt)
+
+        # Where the raw slab lands along its canonical axis
+        region = [slice(None)] * 3
+        region[slab_axis] = (
+            slice(total - stop, total - start) if slab_flip else slice(start, stop)
+        )
+
+        slab_max = int(np.nanmax(slab)) if slab.size else 0
+        if slab_max > np.iinfo(segmentation_store.dtype).max:
+            segmentation_store = segmentation_store.astype(label_dtype(slab_max))
+        segmentation_store[tuple(region)] = to_labels(slab, segmentation_store.dtype)
+
+        if progress_callback is not None:
+            progress_callback(stop, total)
+
+    return segmentation_store
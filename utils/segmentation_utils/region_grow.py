@@ -0,0 +1,230 @@
+# utils/segmentation_utils/region_grow.py
+from bisect import bisect_right
+from collections import OrderedDict
+
+import numpy as np
+
+# Regions larger than this are rejected instead of filled (about 1/2 of a 512^3 volume)
+REGION_GROW_MAX_VOXELS = 64 * 1024 * 1024
+
+# Intensity masks of recently visited slices kept to skip revisits cheaply
+MASK_CACHE_SLICES = 16
+
+
+class RegionTooLarge(ValueError):
+    """Raised when a region grows beyond its voxel cap."""
+
+
+def find_runs(mask):
+    """
+    Horizontal runs of True pixels of a 2D mask.
+    :return: (rows, starts, stops) arrays in row-major order, stops exclusive
+    """
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, stops = np.nonzero(edges == -1)
+    return rows, starts, stops
+
+
+def runs_to_mask(shape, rows, starts, stops):
+    """Rasterize runs from find_runs back into a boolean mask."""
+    # Runs of one row never touch, so their start and stop edges never collide
+    edges = np.zeros((shape[0], shape[1] + 1), dtype=np.int8)
+    edges[rows, starts] = 1
+    edges[rows, stops] = -1
+    return np.cumsum(edges, axis=1, dtype=np.int8)[:, :-1] > 0
+
+
+def fill_slice(mask, seeds):
+    """
+    4-connected scanline fill of ``mask`` from the pixels set in ``seeds``.
+    :return: boolean mask of the filled pixels, or None if no seed lies in ``mask``
+    """
+    rows, starts, stops = find_runs(mask)
+    if len(rows) == 0:
+        return None
+
+    # A run is seeded if the seed count over its columns is non-zero
+    seed_counts = np.zeros((mask.shape[0], mask.shape[1] + 1), dtype=np.int32)
+    np.cumsum(seeds, axis=1, out=seed_counts[:, 1:])
+    seeded = seed_counts[rows, stops] > seed_counts[rows, starts]
+    stack = np.flatnonzero(seeded).tolist()
+    if not stack:
+        return None
+
+    filled = seeded.tolist()
+    row_list, start_list, stop_list = rows.tolist(), starts.tolist(), stops.tolist()
+    offsets = np.searchsorted(rows, np.arange(mask.shape[0] + 1)).tolist()
+    last_row = mask.shape[0] - 1
+    while stack:
+        run = stack.pop()
+        row, start, stop = row_list[run], start_list[run], stop_list[run]
+        for other in (row - 1, row + 1):
+            if other < 0 or other > last_row:
+                continue
+            # Runs of the other row overlapping [start, stop)
+            end = offsets[other + 1]
+            index = bisect_right(stop_list, start, offsets[other], end)
+            while index < end and start_list[index] < stop:
+                if not filled[index]:
+                    filled[index] = True
+                    stack.append(index)
+                index += 1
+
+    selected = np.array(filled)
+    return runs_to_mask(mask.shape, rows[selected], starts[selected], stops[selected])
+
+
+def mask_bounding_box(mask):
+    """:return: (y_min, x_min, y_max, x_max) of the set pixels, half-open"""
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    return rows[0], cols[0], rows[-1] + 1, cols[-1] + 1
+
+
+class GrownRegion:
+    """
+    Voxels of a grown region, kept per slice as bit-packed masks cropped to
+    their bounding box so memory follows the region, not the volume.
+    """
+
+    def __init__(self, slice_shape):
+        self.slice_shape = slice_shape
+        self.slices = {}  # slice index -> (bounding box, packed bits)
+        self.voxel_count = 0
+
+    def __len__(self):
+        return len(self.slices)
+
+    def __contains__(self, slice_index):
+        return slice_index in self.slices
+
+    def slice_mask(self, slice_index):
+        """Full-slice boolean mask of the region on one slice (None if untouched)."""
+        if slice_index not in self.slices:
+            return None
+        (y_min, x_min, y_max, x_max), _ = self.slices[slice_index]
+        mask = np.zeros(self.slice_shape, dtype=bool)
+        mask[y_min:y_max, x_min:x_max] = self.cropped_mask(slice_index)
+        return mask
+
+    def cropped_mask(self, slice_index):
+        """Region mask of one slice cropped to its bounding box."""
+        (y_min, x_min, y_max, x_max), bits = self.slices[slice_index]
+        shape = (y_max - y_min, x_max - x_min)
+        count = shape[0] * shape[1]
+        return np.unpackbits(bits, count=count).view(bool).reshape(shape)
+
+    def add(self, slice_index, mask):
+        """Merge newly filled pixels (a full-slice mask) into one slice."""
+        self.voxel_count += int(np.count_nonzero(mask))
+        previous = self.slice_mask(slice_index)
+        if previous is not None:
+            mask = mask | previous
+        y_min, x_min, y_max, x_max = mask_bounding_box(mask)
+        self.slices[slice_index] = (
+            (y_min, x_min, y_max, x_max),
+            np.packbits(mask[y_min:y_max, x_min:x_max]),
+        )
+
+    def items(self):
+        """Yield (slice index, bounding box, cropped mask) in slice order."""
+        for slice_index in sorted(self.slices):
+            yield slice_index, self.slices[slice_index][0], self.cropped_mask(
+                slice_index
+            )
+
+    def bounding_box(self):
+        """
+        :return: ((start, stop) slice range, (y_min, x_min, y_max, x_max)) of
+                 the whole region; a connected region spans every slice between
+        """
+        boxes = [box for box, _ in self.slices.values()]
+        return (min(self.slices), max(self.slices) + 1), (
+            min(box[0] for box in boxes),
+            min(box[1] for box in boxes),
+            max(box[2] for box in boxes),
+            max(box[3] for box in boxes),
+        )
+
+
+def grow_region(
+    get_slice,
+    num_slices,
+    seed,
+    tolerance,
+    max_voxels=REGION_GROW_MAX_VOXELS,
+    progress_callback=None,
+    cancel_check=None,
+):
+    """
+    Grow the 6-connected region of voxels within ``tolerance`` of the seed
+    intensity, one slice at a time: each slice is filled by scanline runs from
+    its seed pixels, and the new pixels become the seeds of both neighbours.
+    :param get_slice: callable returning the 2D intensity slice of an index
+    :param seed: (slice index, row, col) of the seed voxel
+    :param tolerance: maximum absolute intensity difference from the seed
+    :param max_voxels: RegionTooLarge is raised once the region exceeds this
+    :return: GrownRegion
+    """
+    seed_index, seed_row, seed_col = seed
+    seed_value = float(get_slice(seed_index)[seed_row, seed_col])
+    low, high = seed_value - tolerance, seed_value + tolerance
+
+    masks = OrderedDict()
+
+    def intensity_mask(slice_index):
+        if slice_index in masks:
+            masks.move_to_end(slice_index)
+            return masks[slice_index]
+        data = get_slice(slice_index)
+        mask = (data >= low) & (data <= high)
+        masks[slice_index] = mask
+        if len(masks) > MASK_CACHE_SLICES:
+            masks.popitem(last=False)
+        return mask
+
+    seed_mask = np.zeros(intensity_mask(seed_index).shape, dtype=bool)
+    seed_mask[seed_row, seed_col] = True
+    region = GrownRegion(seed_mask.shape)
+
+    # Pending seeds per slice; seeds for the same slice are merged
+    pending = {seed_index: seed_mask}
+    while pending:
+        if cancel_check is not None:
+            cancel_check()
+        slice_index, seeds = pending.popitem()
+
+        mask = intensity_mask(slice_index)
+        visited = region.slice_mask(slice_index)
+        if visited is not None:
+            mask = mask & ~visited
+        filled = fill_slice(mask, seeds & mask)
+        if filled is None:
+            continue
+
+        region.add(slice_index, filled)
+        if region.voxel_count > max_voxels:
+            raise RegionTooLarge(
+                f"Region exceeds {max_voxels} voxels; lower the tolerance"
+            )
+        if progress_callback is not None:
+            progress_callback(len(region), num_slices)
+
+        for neighbor in (slice_index - 1, slice_index + 1):
+            if not 0 <= neighbor < num_slices:
+                continue
+            # Skip neighbours where every new pixel is already known
+            new_seeds = filled & intensity_mask(neighbor)
+            if neighbor in region:
+                new_seeds &= ~region.slice_mask(neighbor)
+            if not new_seeds.any():
+                continue
+            if neighbor in pending:
+                pending[neighbor] |= new_seeds
+            else:
+                pending[neighbor] = new_seeds
+
+    return region
@@ -0,0 +1,116 @@
+# utils/segmentation_utils/slice_occupancy.py
+import numpy as np
+
+
+def to_bitset(counts):
+    """Python int with bit i set for every non-zero counts[i]."""
+    packed = np.packbits(counts > 0, bitorder="little")
+    return int.from_bytes(packed.tobytes(), "little")
+
+
+class SliceOccupancy:
+    """
+    Number of labelled voxels in every slice along each axis of a label
+    volume, kept up to date from the old and new values of each edit, plus a
+    bitset of the labelled slices per axis for empty checks and jumps.
+    """
+
+    def __init__(self, shape):
+        self.shape = tuple(int(length) for length in shape)
+        self.clear()
+
+    @classmethod
+    def from_store(cls, segmentation_store):
+        occupancy = cls(segmentation_store.shape)
+        occupancy.rebuild(segmentation_store)
+        return occupancy
+
+    def clear(self):
+        self.counts = [np.zeros(length, dtype=np.int64) for length in self.shape]
+        self.bits = [0, 0, 0]
+
+    def rebuild(self, segmentation_store):
+        """Recount a label store (only allocated blocks for sparse stores)."""
+        self.counts = segmentation_store.slice_counts()
+        self.bits = [to_bitset(counts) for counts in self.counts]
+
+    def update(self, volume_box, old_values, new_values):
+        """
+        Account for an edit.
+        :param volume_box: half-open (start, stop) range per axis of the region
+        :param old_values: 3D label values of the region before the edit
+        :param new_values: 3D label values of the region after the edit
+        """
+        delta = (new_values != 0).view(np.int8) - (old_values != 0).view(np.int8)
+        if not delta.any():
+            return
+        for axis in range(3):
+            start, stop = (int(bound) for bound in volume_box[axis])
+            other_axes = tuple(other for other in range(3) if other != axis)
+            counts = self.counts[axis][start:stop]
+            was_labelled = counts > 0
+            counts += delta.sum(axis=other_axes)
+            for index in np.flatnonzero(was_labelled != (counts > 0)).tolist():
+                self.bits[axis] ^= 1 << (start + index)
+
+    def count(self, axis, index):
+        return int(self.counts[axis][index])
+
+    def is_empty(self, axis, index):
+        return not (self.bits[axis] >> index) & 1
+
+    def next_labelled(self, axis, index):
+        """First labelled slice after ``index`` along an axis, or None."""
+        higher = self.bits[axis] >> (index + 1)
+        if not higher:
+            return None
+        return index + (higher & -higher).bit_length()
+
+    def previous_labelled(self, axis, index):
+        """Last labelled slice before ``index`` along an axis, or None."""
+        lower = self.bits[axis] & ((1 << max(index, 0)) - 1)
+        if not lower:
+            return None
+        return lower.bit_length() - 1
+
+
+class ViewOccupancy:
+    """
+    SliceOccupancy along the slices of one view, indexed like that view.
+
+    :param occupancy: SliceOccupancy of the label store
+    :param accessor: SliceAccessor of the view over the same store
+    """
+
+    def __init__(self, occupancy, accessor):
+        self.occupancy = occupancy
+        self.axis = accessor.slice_axis
+        self.flip = accessor.slice_flip
+        self.num_slices = accessor.num_slices
+
+    def raw_index(self, slice_index):
+        return self.num_slices - 1 - slice_index if self.flip else slice_index
+
+    def count(self, slice_index):
+        return self.occupancy.count(self.axis, self.raw_index(slice_index))
+
+    def is_empty(self, slice_index):
+        return self.occupancy.is_empty(self.axis, self.raw_index(slice_index))
+
+    def next_labelled(self, slice_index):
+        """First labelled slice after ``slice_index`` in view order, or None."""
+        raw_index = self.raw_index(slice_index)
+        if self.flip:
+            found = self.occupancy.previous_labelled(self.axis, raw_index)
+        else:
+            found = self.occupancy.next_labelled(self.axis, raw_index)
+        return None if found is None else self.raw_index(found)
+
+    def previous_labelled(self, slice_index):
+        """Last labelled slice before ``slice_index`` in view order, or None."""
+        raw_index = self.raw_index(slice_index)
+        if self.flip:
+            found = self.occupancy.next_labelled(self.axis, raw_index)
+        else:
+            found = self.occupancy.previous_labelled(self.axis, raw_index)
+        return None if found is None else self.raw_index(found)
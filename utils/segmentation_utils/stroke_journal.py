@@ -0,0 +1,183 @@
+# utils/segmentation_utils/stroke_journal.py
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from utils.volume_utils.file_identity import file_key
+
+JOURNAL_DIR = os.environ.get(
+    "PASCAL_JOURNAL_DIR", os.path.join(os.path.expanduser("~"), ".pascal", "journal")
+)
+
+# fsync the journal at most this often; records are flushed to the OS right away
+FSYNC_INTERVAL = 2.0
+
+# Compact the journal into a checkpoint once it grows beyond this size
+CHECKPOINT_BYTES = 32 * 1024 * 1024
+
+VIEWS = ("axial", "coronal", "sagittal")
+
+RECORD_PATCH = 1
+RECORD_CLEAR = 2
+
+# length and crc32 of the payload that follows
+FRAME = struct.Struct("<II")
+# kind, view, dtype char, slice index, y_min, x_min, y_max, x_max
+PATCH_HEADER = struct.Struct("<BBcIIIII")
+# dtype char and shape of the label volume, at the start of a checkpoint
+CHECKPOINT_HEADER = struct.Struct("<cIII")
+# start and extent along each axis of one checkpointed block
+BLOCK_HEADER = struct.Struct("<IIIIII")
+
+
+def frame(payload):
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_frames(data, position=0):
+    """Yield frame payloads of ``data``, stopping at the first torn or corrupt one."""
+    while position + FRAME.size <= len(data):
+        length, crc = FRAME.unpack_from(data, position)
+        payload = data[position + FRAME.size : position + FRAME.size + length]
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            break
+        yield payload
+        position += FRAME.size + length
+
+
+class StrokeJournal:
+    """
+    Append-only log of label edits of one image, compacted into a checkpoint
+    from time to time. Replaying checkpoint + log restores the labels after a
+    crash.
+    """
+
+    def __init__(self, image_path, journal_dir=JOURNAL_DIR):
+        self.directory = os.path.join(journal_dir, file_key(image_path))
+        os.makedirs(self.directory, exist_ok=True)
+        self.log_path = os.path.join(self.directory, "strokes.log")
+        self.checkpoint_path = os.path.join(self.directory, "checkpoint.bin")
+        self.log_file = open(self.log_path, "ab")
+        self.last_sync = time.monotonic()
+        self.revision = 0  # records appended so far, to spot edits made after a save
+
+    def has_data(self):
+        return (
+            os.path.exists(self.checkpoint_path) or os.path.getsize(self.log_path) > 0
+        )
+
+    def append(self, payload):
+        self.log_file.write(frame(payload))
+        self.revision += 1
+        self.log_file.flush()
+        if time.monotonic() - self.last_sync >= FSYNC_INTERVAL:
+            self.sync()
+
+    def record_patch(self, canvas_view, slice_index, bounding_box, values):
+        """Log the new values of a (y_min, x_min, y_max, x_max) region of a slice."""
+        values = np.ascontiguousarray(values)
+        header = PATCH_HEADER.pack(
+            RECORD_PATCH,
+            VIEWS.index(canvas_view),
+            values.dtype.char.encode("ascii"),
+            slice_index,
+            *bounding_box,
+        )
+        self.append(header + zlib.compress(values.tobytes(), 1))
+
+    def record_clear(self):
+        self.append(bytes([RECORD_CLEAR]))
+
+    def sync(self):
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+        self.last_sync = time.monotonic()
+
+    def needs_checkpoint(self):
+        return self.log_file.tell() >= CHECKPOINT_BYTES
+
+    def checkpoint(self, segmentation_store):
+        """Write the labelled blocks of the label store and truncate the log."""
+        temporary_path = self.checkpoint_path + ".tmp"
+        with open(temporary_path, "wb") as checkpoint_file:
+            checkpoint_file.write(
+                CHECKPOINT_HEADER.pack(
+                    segmentation_store.dtype.char.encode("ascii"),
+                    *segmentation_store.shape,
+                )
+            )
+            for start, values in segmentation_store.labelled_blocks():
+                values = np.ascontiguousarray(values)
+                checkpoint_file.write(
+                    frame(
+                        BLOCK_HEADER.pack(*start, *values.shape)
+                        + zlib.compress(values.tobytes(), 1)
+                    )
+                )
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, self.checkpoint_path)
+
+        self.log_file.close()
+        self.log_file = open(self.log_path, "wb")
+        self.sync()
+
+    def replay(self, segmentation_store, accessors):
+        """
+        Restore the journaled labels into an (empty) label store.
+        :return: number of log records applied
+        """
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "rb") as checkpoint_file:
+                data = checkpoint_file.read()
+            dtype_char, *shape = CHECKPOINT_HEADER.unpack_from(data)
+            if tuple(shape) != tuple(segmentation_store.shape):
+                return 0
+            dtype = np.dtype(dtype_char.decode("ascii"))
+            for payload in read_frames(data, CHECKPOINT_HEADER.size):
+                block_header = BLOCK_HEADER.unpack_from(payload)
+                start, extent = block_header[:3], block_header[3:]
+                values = np.frombuffer(
+                    zlib.decompress(payload[BLOCK_HEADER.size :]), dtype=dtype
+                ).reshape(extent)
+                key = tuple(
+                    slice(bound, bound + size) for bound, size in zip(start, extent)
+                )
+                segmentation_store[key] = values
+
+        applied = 0
+        for payload in self.read_records():
+            if payload[0] == RECORD_CLEAR:
+                segmentation_store.clear()
+            elif payload[0] == RECORD_PATCH:
+                _, view, dtype_char, slice_index, y_min, x_min, y_max, x_max = (
+                    PATCH_HEADER.unpack_from(payload)
+                )
+                values = np.frombuffer(
+                    zlib.decompress(payload[PATCH_HEADER.size :]),
+                    dtype=np.dtype(dtype_char.decode("ascii")),
+                ).reshape(y_max - y_min, x_max - x_min)
+                accessors[VIEWS[view]].write_slice(
+                    slice_index, values, (y_min, y_max), (x_min, x_max)
+                )
+            applied += 1
+        return applied
+
+    def read_records(self):
+        """Yield record payloads, stopping at the first torn or corrupt record."""
+        with open(self.log_path, "rb") as log_file:
+            yield from read_frames(log_file.read())
+
+    def discard(self):
+        """Forget all journaled edits, e.g. after the labels were saved."""
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        self.log_file.close()
+        self.log_file = open(self.log_path, "wb")
+
+    def close(self):
+        self.sync()
+        self.log_file.close()
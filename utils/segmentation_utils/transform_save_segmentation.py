@@ -1,31 +1,91 @@
 # utils/segmentation_utils/transform_save_segmentation.py
-from nibabel.orientations import io_orientation, ornt_transform, inv_ornt_aff
-import nibabel as nib
+from nibabel.openers import Opener
+from nibabel.orientations import apply_orientation, io_orientation, ornt_transform
+import os
+
 import numpy as np
 
+DEFAULT_COMPRESSION_LEVEL = 1
+
+# Output slices written (and reported as progress) per chunk
+SAVE_CHUNK_SLICES = 8
+
+
+def original_orientation_view(segmentation_matrix, original_affine):
+    """
+    Reorient a canonical (RAS) label array back to the orientation of the
+    original image. Only flips and transposes; no copy, no dtype conversion.
+    """
+    transform = ornt_transform(
+        io_orientation(np.eye(4)), io_orientation(original_affine)
+    )
+    return apply_orientation(segmentation_matrix, transform)
+
+
+def label_header(original_header, shape, dtype):
+    """Header of the original image adapted to an unscaled integer label volume."""
+    header = original_header.copy()
+    header.set_data_shape(shape)
+    header.set_data_dtype(dtype)
+    header.set_slope_inter(1, 0)
+    header.set_data_offset(
+        header.single_vox_offset + int(header.extensions.get_sizeondisk())
+    )
+    return header
+
 
 def save_transform_segmentation(
-    segmentation_matrix, original_affine, original_header, file_path
+    segmentation_matrix,
+    original_affine,
+    original_header,
+    file_path,
+    compresslevel=DEFAULT_COMPRESSION_LEVEL,
+    progress_callback=None,
+    cancel_check=None,
 ):
+    """
+    Save a canonical label volume in the orientation of the original image.
+    :param segmentation_matrix: canonical label array or label store
+    :param original_affine: affine of the original image
+    :param original_header: header of the original image
+    :param file_path: output path (.nii.gz is appended if missing)
+    :param compresslevel: gzip compression level (0-9)
+    :param progress_callback: optional callable(done, total) called per chunk
+    :param cancel_check: optional callable raising TaskCancelled to abort the save
+    """
     if not file_path.endswith(".nii.gz"):
         file_path += ".nii.gz"
 
-    canonical_img = nib.Nifti1Image(segmentation_matrix, np.eye(4))
-    ras_ornt = io_orientation(np.eye(4))
-    original_ornt = io_orientation(original_affine)
-    transform = ornt_transform(ras_ornt, original_ornt)
-
-    transformed_data = nib.orientations.apply_orientation(
-        canonical_img.get_fdata(), transform
+    # Label stores materialize into their compact integer array
+    segmentation_matrix = np.asarray(segmentation_matrix)
+    transformed_data = original_orientation_view(segmentation_matrix, original_affine)
+    header = label_header(
+        original_header, transformed_data.shape, transformed_data.dtype
     )
+    header.set_sform(original_affine)
+    header.set_qform(original_affine)
 
-    new_affine = original_affine @ inv_ornt_aff(transform, segmentation_matrix.shape)
-    u, s, vh = np.linalg.svd(new_affine[:3, :3])
-    ortho_affine = u @ vh
+    # The header keeps the byte order of the original image
+    disk_dtype = header.get_data_dtype()
+    total = transformed_data.shape[2]
+    try:
+        with Opener(file_path, "wb", compresslevel=compresslevel) as fileobj:
+            header.write_to(fileobj)
+            fileobj.write(b"\x00" * (int(header.get_data_offset()) - fileobj.tell()))
 
-    if np.linalg.det(ortho_affine) < 0:
-        ortho_affine[:, -1] *= -1
-    new_affine[:3, :3] = ortho_affine
+            # NIfTI data is Fortran ordered, so slabs along the last axis are
+            # consecutive pieces of the data block
+            for start in range(0, total, SAVE_CHUNK_SLICES):
+                if cancel_check is not None:
+                    cancel_check()
+                slab = transformed_data[:, :, start : start + SAVE_CHUNK_SLICES]
+                fileobj.write(slab.astype(disk_dtype, copy=False).tobytes(order="F"))
+                if progress_callback is not None:
+                    progress_callback(min(start + SAVE_CHUNK_SLICES, total), total)
+    except BaseException:
+        # Never leave a truncated file behind, whether cancelled or failed
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
 
-    new_img = nib.Nifti1Image(transformed_data, new_affine, original_header)
-    nib.save(new_img, file_path)
+    return file_path
@@ -0,0 +1,77 @@
+# utils/startup_utils/startup.py
+import importlib
+import sys
+import threading
+import time
+
+# Imported in the background while the init window waits for a file,
+# heaviest dependencies first
+WARMUP_MODULES = (
+    "numpy",
+    "nibabel",
+    "PyQt5.QtGui",
+    "canvas.canvas",
+    "windows.main_window",
+)
+
+
+class StartupTimer:
+    """Named timestamps relative to process start, plus per-module import times."""
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks = []  # (name, seconds since start)
+        self.imports = []  # (module, seconds, thread name)
+        self.lock = threading.Lock()
+
+    def mark(self, name):
+        with self.lock:
+            self.marks.append((name, time.perf_counter() - self.start))
+
+    def timed_import(self, module):
+        already_loaded = module in sys.modules
+        start = time.perf_counter()
+        importlib.import_module(module)
+        if not already_loaded:
+            with self.lock:
+                self.imports.append(
+                    (
+                        module,
+                        time.perf_counter() - start,
+                        threading.current_thread().name,
+                    )
+                )
+
+    def report(self):
+        with self.lock:
+            lines = ["Startup report (ms since start):"]
+            lines += [
+                f"  {seconds * 1000:8.1f}  {name}" for name, seconds in self.marks
+            ]
+            lines.append("Imports (ms, cumulative of not yet loaded dependencies):")
+            lines += [
+                f"  {seconds * 1000:8.1f}  {module} [{thread}]"
+                for module, seconds, thread in self.imports
+            ]
+        lines.append("Run with python -X importtime for a per-module breakdown.")
+        return "\n".join(lines)
+
+
+def start_warmup(timer, modules=WARMUP_MODULES):
+    """
+    Import the volume handling stack on a daemon thread. An import of the same
+    module from the GUI thread waits for it instead of importing twice.
+    """
+
+    def warm_up():
+        for module in modules:
+            try:
+                timer.timed_import(module)
+            except Exception as e:
+                print(f"Warmup import of {module} failed: {e}", file=sys.stderr)
+                return
+        timer.mark("background warmup finished")
+
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,5 @@
+# utils/thread_utils/cancellation.py
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task when its cancel_check reports a cancellation."""
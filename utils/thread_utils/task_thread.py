@@ -0,0 +1,46 @@
+# utils/thread_utils/task_thread.py
+import traceback
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from utils.thread_utils.cancellation import TaskCancelled
+
+
+class TaskThread(QThread):
+    """
+    Run ``task(progress_callback=..., cancel_check=...)`` on a worker thread.
+
+    The task reports progress with ``progress_callback(done, total)`` and
+    should call ``cancel_check()`` between chunks of work; it raises
+    TaskCancelled once cancel() has been requested.
+    """
+
+    progress = pyqtSignal(int, int)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, task, parent=None):
+        super().__init__(parent)
+        self.task = task
+        self.cancel_requested = False
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def cancel_check(self):
+        if self.cancel_requested:
+            raise TaskCancelled()
+
+    def run(self):
+        try:
+            result = self.task(
+                progress_callback=self.progress.emit, cancel_check=self.cancel_check
+            )
+        except TaskCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            traceback.print_exc()
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(result)
@@ -0,0 +1,97 @@
+# utils/trace_utils/tracing.py
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+# Path of the Chrome/Perfetto trace written at exit; tracing is off when unset.
+# Read once at import, so @traced functions cost nothing in normal runs.
+TRACE_PATH = os.environ.get("PASCAL_TRACE")
+enabled = bool(TRACE_PATH)
+
+# Oldest events are dropped beyond this many
+MAX_EVENTS = 1_000_000
+
+# (name, phase, start us, duration us, thread id, args)
+events = deque(maxlen=MAX_EVENTS)
+
+_origin = time.perf_counter()
+
+
+def now_us():
+    return (time.perf_counter() - _origin) * 1e6
+
+
+def instant(name, **args):
+    """Record a point event such as a cache hit."""
+    if enabled:
+        events.append((name, "i", now_us(), 0.0, threading.get_ident(), args))
+
+
+def traced(name=None):
+    """
+    Time every call of a function as a span named after it. When tracing is
+    off the function is returned undecorated.
+    """
+
+    def decorator(func):
+        if not enabled:
+            return func
+        label = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = now_us()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                events.append(
+                    (label, "X", start, now_us() - start, threading.get_ident(), None)
+                )
+
+        return wrapper
+
+    return decorator
+
+
+def chrome_trace():
+    """Recorded events in the Chrome trace event format (also read by Perfetto)."""
+    pid = os.getpid()
+    trace_events = [
+        {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": pid,
+            "tid": thread.ident,
+            "args": {"name": thread.name},
+        }
+        for thread in threading.enumerate()
+    ]
+    for name, phase, start, duration, tid, args in list(events):
+        event = {"name": name, "ph": phase, "ts": start, "pid": pid, "tid": tid}
+        if phase == "X":
+            event["dur"] = duration
+        else:
+            event["s"] = "t"
+        if args:
+            event["args"] = args
+        trace_events.append(event)
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(path=None):
+    """
+    Write the trace as JSON (to PASCAL_TRACE by default); open it in
+    chrome://tracing or ui.perfetto.dev.
+    """
+    path = path or TRACE_PATH
+    with open(path, "w") as f:
+        json.dump(chrome_trace(), f)
+    return path
+
+
+if enabled:
+    atexit.register(export_chrome_trace)
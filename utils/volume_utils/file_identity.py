@@ -0,0 +1,10 @@
+# utils/volume_utils/file_identity.py
+import hashlib
+import os
+
+
+def file_key(file_path):
+    """Identify a file by its absolute path, size and modification time."""
+    stat = os.stat(file_path)
+    identity = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()
@@ -0,0 +1,156 @@
+# utils/volume_utils/lazy_volume.py
+from utils.volume_utils import volume_cache
+from utils.volume_utils.slice_accessor import SliceAccessor
+from utils.volume_utils.volume_stats import VolumeStats, compute_volume_stats
+from nibabel.openers import Opener
+from nibabel.orientations import inv_ornt_aff, io_orientation
+import nibabel as nib
+import numpy as np
+
+# Bytes inflated per read (and per progress report) for compressed files
+READ_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def read_compressed_data(file_path, image, progress_callback=None, cancel_check=None):
+    """
+    Inflate the data block of a compressed NIfTI file in chunks, keeping the
+    on-disk dtype.
+    """
+    dtype = image.header.get_data_dtype()
+    nbytes = int(np.prod(image.shape)) * dtype.itemsize
+    buffer = np.empty(nbytes, dtype=np.uint8)
+    view = memoryview(buffer)
+
+    with Opener(file_path, "rb") as fileobj:
+        fileobj.seek(int(image.dataobj.offset))
+        position = 0
+        while position < nbytes:
+            if cancel_check is not None:
+                cancel_check()
+            read = fileobj.readinto(view[position : position + READ_CHUNK_BYTES])
+            if not read:
+                raise ValueError(f"Unexpected end of file in {file_path}")
+            position += read
+            if progress_callback is not None:
+                progress_callback(position, nbytes)
+
+    return buffer.view(dtype).reshape(image.shape, order="F")
+
+
+class LazyVolume:
+    """
+    Read-only NIfTI volume that keeps the on-disk dtype and never materializes
+    the full array. Uncompressed ``.nii`` files are memory-mapped through the
+    ``dataobj`` proxy; ``.nii.gz`` files are inflated once in their native dtype
+    and, with ``use_cache``, memory-mapped from the decompressed-volume cache on
+    later opens.
+
+    The canonical (RAS) reorientation that ``nib.as_closest_canonical`` would
+    perform is kept as index arithmetic: ``ornt[raw_axis] = (canonical_axis, flip)``.
+    """
+
+    def __init__(
+        self, file_path, progress_callback=None, cancel_check=None, use_cache=False
+    ):
+        image = nib.load(file_path, mmap="r")
+        proxy = image.dataobj
+
+        self.use_cache = use_cache and volume_cache.is_cacheable(file_path)
+        cached = volume_cache.lookup(file_path) if self.use_cache else None
+        stats = {}
+
+        if cached is not None:
+            raw, stats = cached
+        elif file_path.endswith(".gz"):
+            raw = read_compressed_data(
+                file_path, image, progress_callback, cancel_check
+            )
+        else:
+            raw = proxy.get_unscaled()
+        while raw.ndim > 3 and raw.shape[-1] == 1:
+            raw = raw[..., 0]
+        if raw.ndim != 3:
+            raise ValueError(f"Expected a 3D volume, got shape {image.shape}")
+
+        self.file_path = file_path
+        self.affine = image.affine
+        self.header = image.header
+        self.raw = raw
+        self.ornt = io_orientation(image.affine)
+
+        # Scaling is only applied to the slices that are actually read
+        slope, inter = float(proxy.slope), float(proxy.inter)
+        self.scaled = (slope, inter) != (1.0, 0.0)
+        self.slope = slope
+        self.inter = inter
+
+        self.cached = cached is not None
+        self.stats = (
+            VolumeStats.from_dict(stats["volume_stats"])
+            if "volume_stats" in stats
+            else None
+        )  # see compute_stats()
+
+        self.shape = tuple(
+            raw.shape[int(np.flatnonzero(self.ornt[:, 0] == axis)[0])]
+            for axis in range(3)
+        )
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32) if self.scaled else self.raw.dtype
+
+    @property
+    def canonical_affine(self):
+        """Affine of the canonical (RAS) view of the volume."""
+        return self.affine @ inv_ornt_aff(self.ornt, self.raw.shape)
+
+    @property
+    def nbytes(self):
+        return self.raw.nbytes
+
+    def slice_accessor(self, view, copy_budget=0):
+        """Build a SliceAccessor for a view that reads straight from the raw array."""
+        return SliceAccessor(
+            self.raw,
+            view,
+            ornt=self.ornt,
+            copy_budget=copy_budget,
+            transform=self.apply_scaling if self.scaled else None,
+        )
+
+    def save_to_cache(self):
+        """
+        Store the decompressed array and its stats in the volume cache and
+        continue from the memory-mapped copy, which releases the inflated buffer.
+        Call before building slice accessors.
+        """
+        if not self.use_cache:
+            return
+        stats = {}
+        if self.stats is not None:
+            stats["volume_stats"] = self.stats.to_dict()
+        if self.cached:
+            volume_cache.update_stats(self.file_path, stats)
+        else:
+            self.raw = volume_cache.store(self.file_path, self.raw, stats)
+            self.cached = True
+
+    def apply_scaling(self, data):
+        if not self.scaled:
+            return data
+        return (data * np.float32(self.slope) + np.float32(self.inter)).astype(
+            np.float32, copy=False
+        )
+
+    def compute_stats(self, progress_callback=None, cancel_check=None):
+        """Compute (once) the scaled min, max and histogram in a single chunked pass."""
+        if self.stats is None:
+            self.stats = compute_volume_stats(
+                self.raw,
+                self.slope,
+                self.inter,
+                progress_callback=progress_callback,
+                cancel_check=cancel_check,
+            )
+        return self.stats
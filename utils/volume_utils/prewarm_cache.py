@@ -0,0 +1,73 @@
+# utils/volume_utils/prewarm_cache.py
+"""
+Fill the decompressed-volume cache ahead of time, e.g. overnight:
+
+    python -m utils.volume_utils.prewarm_cache /data/studies
+    python -m utils.volume_utils.prewarm_cache --info
+"""
+
+import argparse
+import os
+import sys
+
+from utils.volume_utils import volume_cache
+from utils.volume_utils.lazy_volume import LazyVolume
+
+
+def find_volumes(paths):
+    """Expand files and directories into the cacheable image files they contain."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if volume_cache.is_cacheable(name):
+                        yield os.path.join(root, name)
+        elif volume_cache.is_cacheable(path):
+            yield path
+
+
+def prewarm(file_path):
+    """
+    Make sure a file is cached together with its stats.
+    :return: True if a new entry was written
+    """
+    volume = LazyVolume(file_path, use_cache=True)
+    if volume.cached and volume.stats is not None:
+        return False
+    volume.compute_stats()
+    volume.save_to_cache()
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prewarm the PASCAL volume cache")
+    parser.add_argument("paths", nargs="*", help=".nii.gz files or directories")
+    parser.add_argument("--info", action="store_true", help="show cache usage")
+    parser.add_argument("--clear", action="store_true", help="remove all entries")
+    args = parser.parse_args(argv)
+
+    if args.clear:
+        volume_cache.clear()
+
+    failed = 0
+    for file_path in find_volumes(args.paths):
+        try:
+            written = prewarm(file_path)
+            print(f"{'cached' if written else 'up to date'}: {file_path}")
+        except Exception as e:
+            failed += 1
+            print(f"failed: {file_path}: {e}", file=sys.stderr)
+
+    if args.info:
+        cached = volume_cache.entries()
+        total = sum(size for _, size, _ in cached)
+        print(
+            f"{volume_cache.CACHE_DIR}: {len(cached)} entries, "
+            f"{total / 1024**2:.1f} MB of "
+            f"{volume_cache.CACHE_MAX_BYTES / 1024**2:.0f} MB"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
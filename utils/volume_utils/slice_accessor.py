@@ -0,0 +1,196 @@
+# utils/volume_utils/slice_accessor.py
+import threading
+
+import numpy as np
+
+# canonical (RAS) geometry of each view: the slice axis and the axes shown as
+# rows / columns of the 2D slice, each with a flip flag.
+# e.g. axial: slice[r, c] = volume[N0 - 1 - c, N1 - 1 - r, k]
+VIEW_GEOMETRY = {
+    "axial": ((2, False), (1, True), (0, True)),
+    "coronal": ((1, False), (2, True), (0, True)),
+    "sagittal": ((0, True), (2, True), (1, True)),
+}
+
+IDENTITY_ORNT = np.array([[0, 1], [1, 1], [2, 1]])
+
+
+class SliceAccessor:
+    """
+    Per-view slice access for a 3D array, with the axis permutation and flips
+    resolved once instead of rebuilding rot90/flip chains on every request.
+
+    :param array: 3D array (ndarray or memmap) in raw storage order
+    :param view: 'axial', 'coronal' or 'sagittal'
+    :param ornt: nibabel orientation of ``array`` relative to canonical RAS
+    :param copy_budget: bytes allowed for one contiguous (n, rows, cols) copy
+    :param transform: optional callable applied to every slice returned by get()
+    """
+
+    def __init__(self, array, view, ornt=None, copy_budget=0, transform=None):
+        if ornt is None:
+            ornt = IDENTITY_ORNT
+
+        self.array = array
+        self.view = view
+        self.transform = transform
+
+        raw_axes = {int(ornt[axis, 0]): (axis, ornt[axis, 1] < 0) for axis in range(3)}
+        (
+            (self.slice_axis, self.slice_flip),
+            (self.row_axis, self.row_flip),
+            (
+                self.col_axis,
+                self.col_flip,
+            ),
+        ) = [
+            (raw_axes[axis][0], flip != raw_axes[axis][1])
+            for axis, flip in VIEW_GEOMETRY[view]
+        ]
+
+        self.num_slices = array.shape[self.slice_axis]
+        self.slice_shape = (array.shape[self.row_axis], array.shape[self.col_axis])
+
+        # A slice along the slowest-varying axis is already one contiguous block
+        strides = getattr(array, "strides", None)
+        self.strided = strides is not None and self.slice_axis != int(
+            np.argmax(strides)
+        )
+        self.copy_budget = copy_budget
+        self.contiguous_copy = None
+        self.access_count = 0
+        self.copy_lock = threading.Lock()
+
+    def raw_index(self, slice_index):
+        """Index along the raw slice axis for a view slice index."""
+        if self.slice_flip:
+            return self.num_slices - 1 - slice_index
+        return slice_index
+
+    def raw_range(self, start, stop, flip, length):
+        """Map a half-open view range onto the raw axis (and back; it is symmetric)."""
+        if flip:
+            return length - stop, length - start
+        return start, stop
+
+    def volume_box(self, slice_index, rows, cols):
+        """
+        3D box covered by a region of one slice.
+        :param rows: (start, stop) row range in view coordinates
+        :param cols: (start, stop) column range in view coordinates
+        :return: half-open (start, stop) range per raw axis
+        """
+        box = [None] * 3
+        raw_index = self.raw_index(slice_index)
+        box[self.slice_axis] = (raw_index, raw_index + 1)
+        box[self.row_axis] = self.raw_range(*rows, self.row_flip, self.slice_shape[0])
+        box[self.col_axis] = self.raw_range(*cols, self.col_flip, self.slice_shape[1])
+        return tuple(box)
+
+    def view_region(self, volume_box):
+        """
+        Map a 3D box back to this view.
+        :return: ((start, stop) slice range, (y_min, x_min, y_max, x_max) bounding box)
+        """
+        slices = self.raw_range(
+            *volume_box[self.slice_axis], self.slice_flip, self.num_slices
+        )
+        rows = self.raw_range(
+            *volume_box[self.row_axis], self.row_flip, self.slice_shape[0]
+        )
+        cols = self.raw_range(
+            *volume_box[self.col_axis], self.col_flip, self.slice_shape[1]
+        )
+        return slices, (rows[0], cols[0], rows[1], cols[1])
+
+    def region_box(self, slice_range, bounding_box):
+        """Inverse of view_region: 3D box of a bounding box over a range of slices."""
+        y_min, x_min, y_max, x_max = bounding_box
+        box = [None] * 3
+        box[self.slice_axis] = self.raw_range(
+            *slice_range, self.slice_flip, self.num_slices
+        )
+        box[self.row_axis] = self.raw_range(
+            y_min, y_max, self.row_flip, self.slice_shape[0]
+        )
+        box[self.col_axis] = self.raw_range(
+            x_min, x_max, self.col_flip, self.slice_shape[1]
+        )
+        return tuple(box)
+
+    def slicer(self, slice_index, rows=None, cols=None):
+        """Raw index tuple of a (region of a) slice."""
+        rows = rows or (0, self.slice_shape[0])
+        cols = cols or (0, self.slice_shape[1])
+        row_start, row_stop = self.raw_range(*rows, self.row_flip, self.slice_shape[0])
+        col_start, col_stop = self.raw_range(*cols, self.col_flip, self.slice_shape[1])
+
+        slicer = [None] * 3
+        slicer[self.slice_axis] = self.raw_index(slice_index)
+        slicer[self.row_axis] = slice(row_start, row_stop)
+        slicer[self.col_axis] = slice(col_start, col_stop)
+        return tuple(slicer)
+
+    def to_view(self, data):
+        """Reorient a raw 2D slice (axes in raw order) into view rows/columns."""
+        if self.row_axis > self.col_axis:
+            data = data.T
+        return data[
+            slice(None, None, -1 if self.row_flip else 1),
+            slice(None, None, -1 if self.col_flip else 1),
+        ]
+
+    def view_slice(self, slice_index, rows=None, cols=None):
+        """
+        Return one slice in view orientation; for ndarrays this is a (writable,
+        possibly strided) view, for label stores a copy.
+        :param rows: optional (start, stop) row range in view coordinates
+        :param cols: optional (start, stop) column range in view coordinates
+        """
+        return self.to_view(self.array[self.slicer(slice_index, rows, cols)])
+
+    def from_view(self, values):
+        """Inverse of to_view."""
+        values = values[
+            slice(None, None, -1 if self.row_flip else 1),
+            slice(None, None, -1 if self.col_flip else 1),
+        ]
+        if self.row_axis > self.col_axis:
+            values = values.T
+        return values
+
+    def write_slice(self, slice_index, values, rows=None, cols=None):
+        """Write a 2D array given in view orientation into (a region of) a slice."""
+        self.array[self.slicer(slice_index, rows, cols)] = self.from_view(values)
+
+    def get(self, slice_index):
+        """Return one slice as a C-contiguous 2D array."""
+        self.access_count += 1
+        # Leave the first (initial) slice lazy; build the copy once scrolling starts
+        if self.contiguous_copy is None and self.access_count > 1:
+            with self.copy_lock:
+                if self.contiguous_copy is None:
+                    self.build_contiguous_copy()
+
+        if self.contiguous_copy is not None:
+            data = self.contiguous_copy[slice_index]
+        else:
+            data = np.ascontiguousarray(self.view_slice(slice_index))
+
+        if self.transform is not None:
+            data = self.transform(data)
+        return data
+
+    def build_contiguous_copy(self):
+        """Gather the whole volume into (n, rows, cols) order if it fits the budget."""
+        if not self.strided or self.array.nbytes > self.copy_budget:
+            return
+
+        data = self.array.transpose(self.slice_axis, self.row_axis, self.col_axis)
+        self.contiguous_copy = np.ascontiguousarray(
+            data[
+                slice(None, None, -1 if self.slice_flip else 1),
+                slice(None, None, -1 if self.row_flip else 1),
+                slice(None, None, -1 if self.col_flip else 1),
+            ]
+        )
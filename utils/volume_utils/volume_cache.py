@@ -0,0 +1,159 @@
+# utils/volume_utils/volume_cache.py
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from utils.volume_utils.file_identity import file_key
+
+CACHE_DIR = os.environ.get(
+    "PASCAL_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".pascal", "volume_cache"),
+)
+
+# Least recently opened entries are evicted beyond this total size
+CACHE_MAX_BYTES = int(os.environ.get("PASCAL_CACHE_MAX_BYTES", 8 * 1024**3))
+
+# Only worth caching files that actually have to be inflated
+CACHED_SUFFIXES = (".nii.gz",)
+
+# Bytes written per call when storing an entry
+WRITE_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def is_cacheable(file_path):
+    return file_path.endswith(CACHED_SUFFIXES)
+
+
+def entry_paths(key, cache_dir=CACHE_DIR):
+    """Paths of the raw data file and the metadata file of an entry."""
+    return (
+        os.path.join(cache_dir, f"{key}.raw"),
+        os.path.join(cache_dir, f"{key}.json"),
+    )
+
+
+def lookup(file_path, cache_dir=CACHE_DIR):
+    """
+    Open the cached decompressed array of a file.
+    :return: (read-only memmap in the on-disk axis order, stats dict) or None
+    """
+    try:
+        raw_path, meta_path = entry_paths(file_key(file_path), cache_dir)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        data = np.memmap(
+            raw_path,
+            dtype=np.dtype(meta["dtype"]),
+            mode="r",
+            shape=tuple(meta["shape"]),
+            order="F",
+        )
+    except (OSError, ValueError, KeyError):
+        return None
+
+    # Opening an entry makes it the most recently used one
+    os.utime(meta_path)
+    return data, meta.get("stats", {})
+
+
+def store(file_path, data, stats=None, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Write a decompressed array (and its stats) to the cache, then evict old entries.
+    :param data: 3D array in the on-disk axis order
+    :return: read-only memmap of the stored array
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    raw_path, meta_path = entry_paths(file_key(file_path), cache_dir)
+
+    evict(cache_dir, max_bytes - data.nbytes)
+
+    # Write to temporary files first so a crash never leaves a half entry
+    flat = data.reshape(-1, order="F")
+    step = max(WRITE_CHUNK_BYTES // data.dtype.itemsize, 1)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for start in range(0, flat.size, step):
+                f.write(np.ascontiguousarray(flat[start : start + step]).tobytes())
+        os.replace(tmp_path, raw_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    update_stats(file_path, stats, cache_dir, data=data)
+
+    return np.memmap(raw_path, dtype=data.dtype, mode="r", shape=data.shape, order="F")
+
+
+def update_stats(file_path, stats, cache_dir=CACHE_DIR, data=None):
+    """Replace the stats of an entry (data is only needed when creating it)."""
+    raw_path, meta_path = entry_paths(file_key(file_path), cache_dir)
+    if data is not None:
+        meta = {
+            "source": os.path.abspath(file_path),
+            "dtype": data.dtype.str,
+            "shape": list(data.shape),
+        }
+    else:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    meta["stats"] = stats or {}
+
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def entries(cache_dir=CACHE_DIR):
+    """
+    All cache entries, least recently used first.
+    :return: list of (last used time, total bytes, key)
+    """
+    result = []
+    if not os.path.isdir(cache_dir):
+        return result
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        key = name[: -len(".json")]
+        raw_path, meta_path = entry_paths(key, cache_dir)
+        try:
+            size = os.path.getsize(meta_path) + os.path.getsize(raw_path)
+            result.append((os.path.getmtime(meta_path), size, key))
+        except OSError:
+            continue
+    result.sort()
+    return result
+
+
+def remove(key, cache_dir=CACHE_DIR):
+    for path in entry_paths(key, cache_dir):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Remove least recently used entries until the cache fits in max_bytes.
+    Entries that are memory-mapped elsewhere stay readable until unmapped.
+    :return: number of removed entries
+    """
+    cached = entries(cache_dir)
+    total = sum(size for _, size, _ in cached)
+    removed = 0
+    for _, size, key in cached:
+        if total <= max_bytes:
+            break
+        remove(key, cache_dir)
+        total -= size
+        removed += 1
+    return removed
+
+
+def clear(cache_dir=CACHE_DIR):
+    for _, _, key in entries(cache_dir):
+        remove(key, cache_dir)
@@ -0,0 +1,134 @@
+# utils/volume_utils/volume_loader.py
+from functools import partial
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from utils.segmentation_utils.load_segmentation import read_segmentation
+from utils.segmentation_utils.region_grow import grow_region
+from utils.thread_utils.task_thread import TaskThread
+from utils.volume_utils.lazy_volume import LazyVolume
+
+# Resolution of the image loading progress
+PROGRESS_STEPS = 1000
+
+
+def open_volume(file_path, progress_callback=None, cancel_check=None):
+    """
+    Open an image (from the volume cache when possible) and compute its
+    statistics. Progress is reported in PROGRESS_STEPS over both steps so
+    multi-GB byte counts never reach Qt.
+    """
+    # Inflating a .gz file and the statistics pass each take about half the time
+    decode_share = PROGRESS_STEPS // 2 if file_path.endswith(".gz") else 0
+
+    def report(offset, share, done, total):
+        if progress_callback is not None:
+            progress_callback(offset + share * done // max(total, 1), PROGRESS_STEPS)
+
+    volume = LazyVolume(
+        file_path,
+        progress_callback=partial(report, 0, decode_share),
+        cancel_check=cancel_check,
+        use_cache=True,
+    )
+    cached_stats = volume.stats is not None
+    volume.compute_stats(
+        progress_callback=partial(report, decode_share, PROGRESS_STEPS - decode_share),
+        cancel_check=cancel_check,
+    )
+    if not volume.cached or not cached_stats:
+        try:
+            volume.save_to_cache()
+        except OSError as e:
+            print(f"Volume cache unavailable: {e}")
+    report(0, PROGRESS_STEPS, 1, 1)
+    return volume
+
+
+class VolumeLoader(QObject):
+    """
+    Decode images and segmentations (and grow label regions) on worker
+    threads. A new request of the same kind supersedes (cancels and discards)
+    the one in flight, and a new image cancels every pending request.
+    """
+
+    progress = pyqtSignal(str, int, int)  # kind, done, total
+    volume_loaded = pyqtSignal(object)
+    segmentation_loaded = pyqtSignal(object)
+    region_grown = pyqtSignal(object)
+    failed = pyqtSignal(str, str)  # kind, message
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.current = {}  # kind -> TaskThread whose result is still wanted
+        self.running = set()  # every thread that has not finished yet
+
+    def load_volume(self, file_path):
+        self.cancel()
+        self.start("volume", partial(open_volume, file_path), self.volume_loaded)
+
+    def load_segmentation(self, file_path, shape, affine, max_label=255, sparse=True):
+        self.cancel("segmentation")
+        self.start(
+            "segmentation",
+            partial(read_segmentation, file_path, shape, affine, max_label, sparse),
+            self.segmentation_loaded,
+        )
+
+    def grow_region(self, get_slice, num_slices, seed, tolerance, max_voxels):
+        self.cancel("region_grow")
+        self.start(
+            "region_grow",
+            partial(grow_region, get_slice, num_slices, seed, tolerance, max_voxels),
+            self.region_grown,
+        )
+
+    def start(self, kind, task, done_signal):
+        thread = TaskThread(task, self)
+        thread.progress.connect(
+            lambda done, total: self.is_current(kind, thread)
+            and self.progress.emit(kind, done, total)
+        )
+        thread.succeeded.connect(
+            lambda result: self.finish(kind, thread) and done_signal.emit(result)
+        )
+        thread.failed.connect(
+            lambda message: self.finish(kind, thread)
+            and self.failed.emit(kind, message)
+        )
+        thread.cancelled.connect(lambda: self.finish(kind, thread))
+        thread.finished.connect(lambda: self.release(thread))
+
+        self.current[kind] = thread
+        self.running.add(thread)
+        self.busy_changed.emit(True)
+        thread.start()
+
+    def is_current(self, kind, thread):
+        return self.current.get(kind) is thread
+
+    def finish(self, kind, thread):
+        """Forget a finished thread; returns False if its result was superseded."""
+        if not self.is_current(kind, thread):
+            return False
+        del self.current[kind]
+        if not self.current:
+            self.busy_changed.emit(False)
+        return True
+
+    def release(self, thread):
+        self.running.discard(thread)
+        thread.deleteLater()
+
+    def cancel(self, kind=None):
+        for current_kind in list(self.current):
+            if kind is None or current_kind == kind:
+                self.current.pop(current_kind).cancel()
+        if not self.current:
+            self.busy_changed.emit(False)
+
+    def shutdown(self):
+        self.cancel()
+        for thread in list(self.running):
+            thread.wait()
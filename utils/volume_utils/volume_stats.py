@@ -0,0 +1,191 @@
+# utils/volume_utils/volume_stats.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Resolution of the stored histogram between the volume min and max
+HISTOGRAM_BINS = 4096
+
+# Per-chunk histogram resolution for float (and wide integer) volumes
+FINE_BINS = 65536
+
+# Histogram sample stride along both in-plane axes (1: every voxel)
+HISTOGRAM_SAMPLE_STEP = 4
+
+STATS_CHUNK_SLICES = 16
+STATS_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class VolumeStats:
+    """
+    Min, max and a HISTOGRAM_BINS histogram of a volume, enough to answer
+    percentile queries without touching the voxels again.
+    The histogram total is the number of sampled voxels, not the volume size.
+    """
+
+    def __init__(self, min_value, max_value, histogram):
+        self.min = float(min_value)
+        self.max = float(max_value)
+        self.histogram = np.asarray(histogram, dtype=np.int64)
+
+    @property
+    def bin_edges(self):
+        return np.linspace(self.min, self.max, len(self.histogram) + 1)
+
+    @property
+    def count(self):
+        return int(self.histogram.sum())
+
+    def percentile(self, q):
+        """Value below which q percent of the voxels fall (linear within a bin)."""
+        return float(self.percentiles([q])[0])
+
+    def percentiles(self, qs):
+        cumulative = np.concatenate(([0], np.cumsum(self.histogram)))
+        if cumulative[-1] == 0:
+            return np.full(len(qs), self.min)
+        targets = (
+            np.clip(np.asarray(qs, dtype=np.float64), 0, 100) / 100 * cumulative[-1]
+        )
+        return np.interp(targets, cumulative, self.bin_edges)
+
+    def display_range(self, low=0.5, high=99.5):
+        """Robust (low, high) percentile window; falls back to min/max for flat data."""
+        low_value, high_value = self.percentiles([low, high])
+        if high_value <= low_value:
+            return self.min, self.max
+        return float(low_value), float(high_value)
+
+    def scaled(self, slope, inter):
+        """Stats of ``data * slope + inter``."""
+        if (slope, inter) == (1.0, 0.0):
+            return self
+        bounds = sorted((self.min * slope + inter, self.max * slope + inter))
+        histogram = self.histogram[::-1] if slope < 0 else self.histogram
+        return VolumeStats(bounds[0], bounds[1], histogram)
+
+    def to_dict(self):
+        return {
+            "min": self.min,
+            "max": self.max,
+            "histogram": self.histogram.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["min"], data["max"], data["histogram"])
+
+
+def exact_chunk_histogram(sample):
+    """Count every value of a <= 16-bit integer sample (index 0 = the dtype minimum)."""
+    if sample.dtype.kind == "i":
+        # Flipping the sign bit maps signed values onto unsigned ones in order
+        unsigned = sample.view(np.dtype(f"u{sample.dtype.itemsize}"))
+        values = unsigned ^ np.array(
+            1 << (8 * sample.dtype.itemsize - 1), unsigned.dtype
+        )
+    else:
+        values = sample
+    return np.bincount(values.ravel(), minlength=1 << (8 * sample.dtype.itemsize))
+
+
+def fine_chunk_histogram(sample):
+    """
+    Histogram of a sample over its own finite range.
+    :return: (min, max, FINE_BINS histogram) or None if there are no finite values
+    """
+    if sample.dtype.kind == "f":
+        sample = sample[np.isfinite(sample)]
+    if sample.size == 0:
+        return None
+    sample_min, sample_max = sample.min(), sample.max()
+    histogram, _ = np.histogram(sample, bins=FINE_BINS, range=(sample_min, sample_max))
+    return float(sample_min), float(sample_max), histogram
+
+
+def rebin(centers, counts, min_value, max_value):
+    histogram, _ = np.histogram(
+        centers, bins=HISTOGRAM_BINS, range=(min_value, max_value), weights=counts
+    )
+    return histogram.astype(np.int64)
+
+
+def compute_volume_stats(
+    raw,
+    slope=1.0,
+    inter=0.0,
+    chunk_slices=STATS_CHUNK_SLICES,
+    sample_step=HISTOGRAM_SAMPLE_STEP,
+    max_workers=STATS_WORKERS,
+    progress_callback=None,
+    cancel_check=None,
+):
+    """
+    Min, max and histogram of a 3D array in one chunked pass over its last axis.
+    Min and max are exact; the histogram counts a regular in-plane sample of
+    the voxels (exactly for integer volumes up to 16 bits, binned per chunk
+    and merged otherwise).
+    :param raw: 3D array (memmap or in memory) in its on-disk dtype
+    :param slope: scaling applied to the raw values
+    :param inter: intercept applied to the raw values
+    :param sample_step: histogram sample stride along each in-plane axis
+    :return: VolumeStats in scaled units
+    """
+    if raw.dtype.kind == "b":
+        raw = raw.view(np.uint8)
+    exact = raw.dtype.kind in "iu" and raw.dtype.itemsize <= 2
+    is_float = raw.dtype.kind == "f"
+    last = raw.shape[2]
+    starts = range(0, last, chunk_slices)
+
+    def process(start):
+        if cancel_check is not None:
+            cancel_check()
+        chunk = np.asarray(raw[:, :, start : start + chunk_slices])
+        # fmin/fmax skip NaNs without the copies np.nanmin makes
+        chunk_min = np.fmin.reduce(chunk, axis=None) if is_float else chunk.min()
+        chunk_max = np.fmax.reduce(chunk, axis=None) if is_float else chunk.max()
+        sample = chunk[::sample_step, ::sample_step]
+        if exact:
+            return chunk_min, chunk_max, exact_chunk_histogram(sample)
+        return chunk_min, chunk_max, fine_chunk_histogram(sample)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        try:
+            for done, result in enumerate(executor.map(process, starts), 1):
+                results.append(result)
+                if progress_callback is not None:
+                    progress_callback(done, len(starts))
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    bounds = [
+        (float(chunk_min), float(chunk_max))
+        for chunk_min, chunk_max, _ in results
+        if not (np.isnan(chunk_min) or np.isnan(chunk_max))
+    ]
+    if not bounds:
+        return VolumeStats(0, 0, np.zeros(HISTOGRAM_BINS, np.int64))
+    min_value = min(chunk_min for chunk_min, _ in bounds)
+    max_value = max(chunk_max for _, chunk_max in bounds)
+
+    if exact:
+        counts = np.sum([result[2] for result in results], axis=0)
+        occupied = np.flatnonzero(counts)
+        values = occupied.astype(np.float64) + np.iinfo(raw.dtype).min
+        histogram = rebin(values, counts[occupied], min_value, max_value)
+    else:
+        histogram = np.zeros(HISTOGRAM_BINS, np.int64)
+        for _, _, fine in results:
+            if fine is None:
+                continue
+            # Each fine bin is attributed to the global bin containing its center
+            sample_min, sample_max, counts = fine
+            width = (sample_max - sample_min) / FINE_BINS
+            centers = sample_min + (np.arange(FINE_BINS) + 0.5) * width
+            histogram += rebin(centers, counts, min_value, max_value)
+
+    return VolumeStats(min_value, max_value, histogram).scaled(slope, inter)
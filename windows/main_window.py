@@ -1,4 +1,6 @@
 # main_window.py
+from functools import partial
+
 from canvas.canvas import Canvas
 from menu.file import (
     load_image_dialog,
@@ -8,16 +10,65 @@ from menu.file import (
 from PyQt5.QtWidgets import (
     QAction,
     QComboBox,
+    QDoubleSpinBox,
     QHBoxLayout,
     QLabel,
     QMainWindow,
+    QProgressBar,
     QPushButton,
     QVBoxLayout,
     QWidget,
     QDialog,
+    QDockWidget,
+    QTableWidget,
+    QTableWidgetItem,
 )
-import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QKeySequence
+from utils.cache_utils.prefetch import SlicePrefetcher
+from utils.image_utils.window_level import WINDOW_PRESETS, window_from_range
+from utils.segmentation_utils.history import (
+    ClearPatch,
+    SegmentationHistory,
+    SlicePatch,
+)
+from utils.segmentation_utils.label_stats import LabelStatistics
+from utils.segmentation_utils.label_store import create_label_store
+from utils.segmentation_utils.load_segmentation import check_segmentation_header
+from utils.segmentation_utils.region_grow import REGION_GROW_MAX_VOXELS
+from utils.segmentation_utils.slice_occupancy import SliceOccupancy, ViewOccupancy
+from utils.segmentation_utils.stroke_journal import StrokeJournal
+from utils.trace_utils import tracing
+from utils.trace_utils.tracing import traced
+from utils.volume_utils.slice_accessor import SliceAccessor, VIEW_GEOMETRY
+from utils.volume_utils.volume_loader import VolumeLoader
 import nibabel as nib
+import numpy as np
+
+# Per-view contiguous copies are only kept for volumes up to this size
+CONTIGUOUS_COPY_BUDGET = 256 * 1024 * 1024
+
+# Slices rendered ahead of the scroll direction and worker threads doing it
+PREFETCH_DEPTH = 8
+PREFETCH_WORKERS = 2
+
+# Memory cap of the compressed undo/redo history
+HISTORY_MAX_BYTES = 64 * 1024 * 1024
+
+# Allocate label blocks only where painted (False: one dense uint8/uint16 volume)
+SPARSE_LABEL_STORE = True
+LABEL_NAMES = ["Clear", "Red", "Green", "Blue", "Yellow", "Sky Blue", "Purple"]
+# Labels the brush paints (1..NUM_BRUSH_LABELS); label 0 clears
+NUM_BRUSH_LABELS = len(LABEL_NAMES) - 1
+
+# Initial display window as (low, high) intensity percentiles
+DISPLAY_PERCENTILES = (0.5, 99.5)
+
+# Default intensity tolerance of the region grow tool (image units)
+REGION_GROW_TOLERANCE = 100.0
+
+# gzip level of saved segmentations (1: fastest, 9: smallest)
+SAVE_COMPRESSION_LEVEL = 1
 
 
 class MainWindow(QMainWindow):
@@ -35,8 +86,23 @@ class MainWindow(QMainWindow):
         self.nifti_affine = None
         self.nifti_header = None
 
-        self.nifti_array = None
-        self.segmentation_array = None
+        self.nifti_volume = None
+        self.nifti_min = None
+        self.nifti_max = None
+        self.auto_window = None
+        self.window = None
+        self.segmentation_store = None
+        self.label_stats = LabelStatistics()
+        self.occupancy = None
+        self.nifti_accessors = {}
+        self.segmentation_accessors = {}
+        self.prefetcher = SlicePrefetcher(PREFETCH_DEPTH, PREFETCH_WORKERS)
+        self.history = SegmentationHistory(HISTORY_MAX_BYTES)
+        self.save_threads = set()  # saves still writing their file
+        self.journal = None
+        self.loader = VolumeLoader(self)
+        # (label store, label) of the running region grow
+        self.region_grow_target = None
 
         self.connect_signal()
         self.create_menu()
@@ -55,11 +121,26 @@ class MainWindow(QMainWindow):
 
         brush_color_label = QLabel("Brush Color:")
         brush_color_dropdown = QComboBox()
-        brush_colors = ["Clear", "Red", "Green", "Blue", "Yellow", "Sky Blue", "Purple"]
-        brush_color_dropdown.addItems(brush_colors)
+        brush_color_dropdown.addItems(LABEL_NAMES)
         brush_color_dropdown.setCurrentIndex(1)
         brush_color_dropdown.currentIndexChanged.connect(self.change_brush_color)
 
+        tool_label = QLabel("Tool:")
+        tool_dropdown = QComboBox()
+        tool_dropdown.addItems(["Brush", "Region Grow"])
+        tool_dropdown.currentIndexChanged.connect(self.change_tool)
+
+        tolerance_label = QLabel("Tolerance:")
+        self.tolerance_spin_box = QDoubleSpinBox()
+        self.tolerance_spin_box.setRange(0.0, 1e6)
+        self.tolerance_spin_box.setDecimals(1)
+        self.tolerance_spin_box.setValue(REGION_GROW_TOLERANCE)
+
+        window_label = QLabel("Window:")
+        self.window_dropdown = QComboBox()
+        self.window_dropdown.addItems(["Auto"] + list(WINDOW_PRESETS))
+        self.window_dropdown.currentIndexChanged.connect(self.change_window_preset)
+
         clear_all_button = QPushButton("Clear All")
         clear_all_button.clicked.connect(self.clear_all_segmentations)
 
@@ -68,6 +149,12 @@ class MainWindow(QMainWindow):
         button_layout.addWidget(brush_size_dropdown)
         button_layout.addWidget(brush_color_label)
         button_layout.addWidget(brush_color_dropdown)
+        button_layout.addWidget(tool_label)
+        button_layout.addWidget(tool_dropdown)
+        button_layout.addWidget(tolerance_label)
+        button_layout.addWidget(self.tolerance_spin_box)
+        button_layout.addWidget(window_label)
+        button_layout.addWidget(self.window_dropdown)
         button_layout.addWidget(clear_all_button)
 
         canvas_layout = QHBoxLayout()
@@ -81,6 +168,35 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(layout)
         self.setCentralWidget(central_widget)
 
+        # 백그라운드 로딩 진행률 및 취소 버튼
+        self.load_progress_bar = QProgressBar()
+        self.load_progress_bar.setMaximumWidth(240)
+        self.load_cancel_button = QPushButton("Cancel")
+        self.load_cancel_button.clicked.connect(self.loader.cancel)
+        self.statusBar().addPermanentWidget(self.load_progress_bar)
+        self.statusBar().addPermanentWidget(self.load_cancel_button)
+        self.set_loading(False)
+
+        self.create_label_panel()
+
+    def create_label_panel(self):
+        """
+        Label별 voxel 수와 부피(mL)를 보여주는 패널 (View 메뉴에서 표시/숨김)
+        """
+        self.label_table = QTableWidget(0, 3)
+        self.label_table.setHorizontalHeaderLabels(["Label", "Voxels", "Volume (mL)"])
+        self.label_table.verticalHeader().setVisible(False)
+        self.label_table.setEditTriggers(QTableWidget.NoEditTriggers)
+
+        self.label_dock = QDockWidget("Label Statistics", self)
+        self.label_dock.setWidget(self.label_table)
+        self.label_dock.visibilityChanged.connect(
+            lambda visible: self.refresh_label_panel()
+        )
+        self.addDockWidget(Qt.RightDockWidgetArea, self.label_dock)
+        self.label_dock.hide()
+        self.view_menu.addAction(self.label_dock.toggleViewAction())
+
     def create_menu(self):
         self.menu_bar = self.menuBar()
         file_menu = self.menu_bar.addMenu("File")
@@ -97,10 +213,58 @@ class MainWindow(QMainWindow):
         save_nifti_action.triggered.connect(self.save_segmentation)
         file_menu.addAction(save_nifti_action)
 
+        edit_menu = self.menu_bar.addMenu("Edit")
+
+        undo_action = QAction("Undo", self)
+        undo_action.setShortcut(QKeySequence.Undo)
+        undo_action.triggered.connect(self.undo)
+        edit_menu.addAction(undo_action)
+
+        redo_action = QAction("Redo", self)
+        redo_action.setShortcut(QKeySequence.Redo)
+        redo_action.triggered.connect(self.redo)
+        edit_menu.addAction(redo_action)
+
+        view_menu = self.menu_bar.addMenu("View")
+        self.view_menu = view_menu
+
+        stats_action = QAction("Performance Overlay", self)
+        stats_action.setCheckable(True)
+        stats_action.toggled.connect(self.set_show_stats)
+        view_menu.addAction(stats_action)
+
+        # PASCAL_TRACE=<file.json> 실행 시에만 trace가 기록됨 (종료 시 자동 저장)
+        if tracing.enabled:
+            export_trace_action = QAction("Export Trace", self)
+            export_trace_action.triggered.connect(self.export_trace)
+            view_menu.addAction(export_trace_action)
+
     def connect_signal(self):
         for canvas in self.canvas_list[0]:
-            canvas.segmentation_updated.connect(self.update_other_canvases)
+            canvas.segmentation_updated.connect(self.commit_stroke)
+            canvas.stroke_finished.connect(self.finish_stroke)
             canvas.request_slice.connect(self.update_slice_canvas)
+            canvas.window_level_changed.connect(self.sync_window_level)
+            canvas.seed_selected.connect(self.start_region_grow)
+
+        self.loader.progress.connect(self.show_load_progress)
+        self.loader.busy_changed.connect(self.set_loading)
+        self.loader.volume_loaded.connect(self.set_volume)
+        self.loader.segmentation_loaded.connect(self.set_loaded_segmentation)
+        self.loader.region_grown.connect(self.apply_region_grow)
+        self.loader.failed.connect(self.load_failed)
+
+    def closeEvent(self, event):
+        # Let running saves finish so their output files are complete
+        for save_thread in list(self.save_threads):
+            save_thread.wait()
+        self.loader.shutdown()
+        self.prefetcher.shutdown()
+        if self.journal is not None:
+            # 정상 종료이므로 복원할 기록이 필요 없음
+            self.journal.discard()
+            self.journal.close()
+        super().closeEvent(event)
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
@@ -114,20 +278,20 @@ class MainWindow(QMainWindow):
             if file_paths:
                 self.drag_drop_dialog(file_paths[0])
 
-    def drag_drop_dialog(self, file_paths):
+    def drag_drop_dialog(self, file_path):
         popup = QDialog(self)
         popup.setWindowTitle("Quick Action Dialog")
         popup.setFixedSize(300, 200)
         layout = QVBoxLayout(popup)
         button_LoadMainImage = QPushButton(f"Load Main Image")
         button_LoadMainImage.clicked.connect(
-            lambda: self.handle_button_click(popup, self.load_nifti_file, file_paths)
+            lambda: self.handle_button_click(popup, self.load_nifti_file, file_path)
         )
         layout.addWidget(button_LoadMainImage)
         button_LoadSegmentation = QPushButton(f"Load Segmentation")
         button_LoadSegmentation.clicked.connect(
             lambda: self.handle_button_click(
-                popup, self.load_segmentation_file, file_paths[0]
+                popup, self.load_segmentation_file, file_path
             )
         )
         layout.addWidget(button_LoadSegmentation)
@@ -139,33 +303,184 @@ class MainWindow(QMainWindow):
         dialog.accept()
 
     def update_all_canvases(self):
+        # 세 canvas가 공유하는 overlay 캐시를 한 번에 비우고 generation을 갱신
+        self.canvas_list[0][0].render_cached_segmentation.cache_clear()
         for canvas in self.canvas_list[0]:
-            canvas.update_slice()
+            canvas.reset_segmentation()
+            self.update_slice_canvas(canvas.current_slice_index, canvas.canvas_view)
 
-    def update_other_canvases(self, pos_set, canvas_view):
-        if canvas_view == "axial":
-            self.canvas_list[0][1].external_update_and_invalidate_cache(
-                set(x[0] for x in pos_set)
-            )
-            self.canvas_list[0][2].external_update_and_invalidate_cache(
-                set(x[1] for x in pos_set)
-            )
-        elif canvas_view == "coronal":
-            self.canvas_list[0][0].external_update_and_invalidate_cache(
-                set(x[0] for x in pos_set)
-            )
-            self.canvas_list[0][2].external_update_and_invalidate_cache(
-                set(x[1] for x in pos_set)
-            )
-        elif canvas_view == "sagittal":
-            self.canvas_list[0][0].external_update_and_invalidate_cache(
-                set(x[0] for x in pos_set)
+    def canvas_for_view(self, canvas_view):
+        for canvas in self.canvas_list[0]:
+            if canvas.canvas_view == canvas_view:
+                return canvas
+        return None
+
+    def commit_stroke(self, stroke_region, canvas_view, slice_index):
+        """
+        Canvas 슬라이스에 그려진 stroke 영역을 label store에 반영하고
+        undo history 기록 및 다른 canvas 무효화를 수행하는 함수
+        """
+        y_min, x_min, y_max, x_max = stroke_region.bounding_box
+        rows, cols = (y_min, y_max), (x_min, x_max)
+        new_values = self.canvas_for_view(canvas_view).segmentation_array[
+            y_min:y_max, x_min:x_max
+        ]
+        accessor = self.segmentation_accessors[canvas_view]
+        accessor.write_slice(slice_index, new_values, rows, cols)
+        self.journal_patch(
+            canvas_view, slice_index, stroke_region.bounding_box, new_values
+        )
+        self.record_label_change(
+            canvas_view,
+            slice_index,
+            stroke_region.bounding_box,
+            stroke_region.old_values,
+            new_values,
+        )
+        self.refresh_label_panel()
+
+        self.history.record(
+            SlicePatch(
+                canvas_view,
+                slice_index,
+                stroke_region.bounding_box,
+                stroke_region.old_values,
+                new_values,
             )
-            self.canvas_list[0][1].external_update_and_invalidate_cache(
-                set(x[1] for x in pos_set)
+        )
+        self.update_other_canvases(
+            accessor.volume_box(slice_index, rows, cols), canvas_view
+        )
+
+    def record_label_change(
+        self, canvas_view, slice_index, bounding_box, old_values, new_values
+    ):
+        """
+        한 뷰 슬라이스 영역의 변경 전/후 값으로 label 통계와 슬라이스 occupancy를 갱신하는 함수
+        """
+        self.label_stats.update(old_values, new_values)
+
+        accessor = self.segmentation_accessors[canvas_view]
+        y_min, x_min, y_max, x_max = bounding_box
+        volume_box = accessor.volume_box(slice_index, (y_min, y_max), (x_min, x_max))
+        self.occupancy.update(
+            volume_box,
+            np.expand_dims(accessor.from_view(old_values), accessor.slice_axis),
+            np.expand_dims(accessor.from_view(new_values), accessor.slice_axis),
+        )
+
+    @traced()
+    def update_other_canvases(self, volume_box, canvas_view):
+        self.invalidate_volume_box(volume_box, exclude_view=canvas_view)
+
+    def finish_stroke(self, canvas_view):
+        self.history.end_entry()
+
+    def undo(self):
+        self.apply_history(self.history.undo(), undo=True)
+
+    def redo(self):
+        self.apply_history(self.history.redo(), undo=False)
+
+    def apply_history(self, patches, undo):
+        """
+        Undo/redo patch들을 segmentation에 적용하고 바뀐 슬라이스만 무효화하는 함수
+        """
+        if patches is None or self.segmentation_store is None:
+            return
+
+        for patch in patches:
+            old_values, new_values = patch.transition(undo)
+            volume_box = patch.apply(
+                self.segmentation_store, self.segmentation_accessors, undo
             )
-        else:
+            if volume_box is None:
+                self.label_stats.update(old_values, new_values)
+                self.occupancy.rebuild(self.segmentation_store)
+                self.journal_checkpoint()
+                self.refresh_all_segmentations()
+            else:
+                self.record_label_change(
+                    patch.canvas_view,
+                    patch.slice_index,
+                    patch.bounding_box,
+                    old_values,
+                    new_values,
+                )
+                y_min, x_min, y_max, x_max = patch.bounding_box
+                self.journal_patch(
+                    patch.canvas_view,
+                    patch.slice_index,
+                    patch.bounding_box,
+                    self.segmentation_accessors[patch.canvas_view].view_slice(
+                        patch.slice_index, (y_min, y_max), (x_min, x_max)
+                    ),
+                )
+                self.invalidate_volume_box(volume_box)
+        self.refresh_label_panel()
+
+    def open_journal(self, file_path):
+        """
+        이미지별 stroke journal을 열고, 이전 세션(crash 등)의 기록이 있으면 복원하는 함수
+        """
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        try:
+            self.journal = StrokeJournal(file_path)
+            if self.journal.has_data():
+                applied = self.journal.replay(
+                    self.segmentation_store, self.segmentation_accessors
+                )
+                print(f"Restored segmentation from journal ({applied} strokes)")
+                self.label_stats = LabelStatistics.from_store(self.segmentation_store)
+                self.occupancy.rebuild(self.segmentation_store)
+                self.refresh_label_panel()
+                # 복원된 상태를 checkpoint로 압축 (잘린 마지막 기록도 정리됨)
+                self.journal.checkpoint(self.segmentation_store)
+        except Exception as e:
+            print(f"Stroke journal unavailable: {e}")
+            self.journal = None
+
+    def journal_patch(self, canvas_view, slice_index, bounding_box, values):
+        if self.journal is None:
             return
+        if not self.journal.has_data():
+            # 저장 후 비워진 journal은 현재 label 상태부터 다시 기록
+            self.journal_checkpoint()
+        self.journal.record_patch(canvas_view, slice_index, bounding_box, values)
+        if self.journal.needs_checkpoint():
+            self.journal_checkpoint()
+
+    def journal_checkpoint(self):
+        if self.journal is not None and self.segmentation_store is not None:
+            self.journal.checkpoint(self.segmentation_store)
+
+    def refresh_all_segmentations(self):
+        for canvas in self.canvas_list[0]:
+            canvas.clear_cached_segmentation()
+            self.update_slice_canvas(canvas.current_slice_index, canvas.canvas_view)
+
+    def invalidate_volume_box(self, volume_box, exclude_view=None):
+        """
+        변경된 3D 영역(volume_box)에 걸친 슬라이스들만 각 canvas에서 무효화하는 함수
+        """
+        for canvas in self.canvas_list[0]:
+            if canvas.canvas_view == exclude_view:
+                continue
+            accessor = self.segmentation_accessors[canvas.canvas_view]
+            slice_range, bounding_box = accessor.view_region(volume_box)
+
+            # canvas가 보고 있는 슬라이스 사본의 바뀐 영역을 store에서 다시 읽음
+            start, stop = slice_range
+            if start <= canvas.current_slice_index < stop:
+                y_min, x_min, y_max, x_max = bounding_box
+                canvas.segmentation_array[y_min:y_max, x_min:x_max] = (
+                    accessor.view_slice(
+                        canvas.current_slice_index, (y_min, y_max), (x_min, x_max)
+                    )
+                )
+            canvas.external_update_and_invalidate_cache(slice_range, bounding_box)
 
     def update_slice_canvas(self, slice_index, canvas_view):
         nifti_slice, segmentation_slice = self.get_slice_for_view(
@@ -179,36 +494,35 @@ class MainWindow(QMainWindow):
         for canvas in self.canvas_list[0]:
             if canvas.canvas_view == canvas_view:
                 canvas.set_slice_data(nifti_slice, segmentation_slice)
+                self.prefetch_slices(canvas, slice_index)
                 break
 
+    def prefetch_slices(self, canvas, slice_index):
+        """
+        스크롤 방향의 다음 슬라이스들을 백그라운드에서 미리 렌더링하는 함수
+        """
+        accessor = self.nifti_accessors[canvas.canvas_view]
+        size_tuple = canvas.display_size()
+        self.prefetcher.update(
+            canvas.canvas_view,
+            slice_index,
+            accessor.num_slices,
+            canvas.render_cached_image.cache,
+            canvas.background_cache_key,
+            lambda index: canvas.create_index_image(accessor.get(index), size_tuple),
+        )
+
     def get_slice_for_view(self, canvas_view, slice_index):
         """
         특정 뷰에 대한 Nifti 및 Segmentation slice를 반환하는 함수
         """
-        if canvas_view == "axial":
-            nifti_slice = np.rot90(self.nifti_array, k=1, axes=(0, 1))[:, ::-1, :][
-                :, :, slice_index
-            ]
-            segmentation_slice = np.rot90(self.segmentation_array, k=1, axes=(0, 1))[
-                :, ::-1, :
-            ][:, :, slice_index]
-        elif canvas_view == "coronal":
-            nifti_slice = np.rot90(self.nifti_array, k=1, axes=(0, 2))[:, :, ::-1][
-                :, slice_index, :
-            ]
-            segmentation_slice = np.rot90(self.segmentation_array, k=1, axes=(0, 2))[
-                :, :, ::-1
-            ][:, slice_index, :]
-        elif canvas_view == "sagittal":
-            nifti_slice = np.rot90(self.nifti_array, k=1, axes=(1, 2))[::-1, :, ::-1][
-                slice_index, :, :
-            ]
-            segmentation_slice = np.rot90(self.segmentation_array, k=1, axes=(1, 2))[
-                ::-1, :, ::-1
-            ][slice_index, :, :]
-        else:
+        if canvas_view not in VIEW_GEOMETRY or not self.nifti_accessors:
             return None, None
 
+        # 둘 다 C-contiguous 복사본; segmentation 사본에 그린 내용은 commit_stroke에서 반영
+        nifti_slice = self.nifti_accessors[canvas_view].get(slice_index)
+        segmentation_slice = self.segmentation_accessors[canvas_view].get(slice_index)
+
         return nifti_slice, segmentation_slice
 
     def load_nifti(self):
@@ -217,24 +531,87 @@ class MainWindow(QMainWindow):
             self.load_nifti_file(file_path)
 
     def load_nifti_file(self, file_path):
+        """
+        이미지를 백그라운드에서 읽기 시작하는 함수 (완료 시 set_volume 호출)
+        """
+        self.statusBar().showMessage(f"Loading {file_path}")
+        self.loader.load_volume(file_path)
+
+    def set_volume(self, volume):
+        """
+        백그라운드에서 읽은 이미지를 GUI 스레드에서 화면에 적용하는 함수
+        """
         try:
-            nifti_data = nib.load(file_path)
-            self.nifti_array = nib.as_closest_canonical(nifti_data).get_fdata()
-            self.nifti_affine = nifti_data.affine
-            self.nifti_header = nifti_data.header
-            self.segmentation_array = np.zeros_like(self.nifti_array, dtype=np.int32)
+            self.prefetcher.reset()
+            self.history.clear()
+            self.nifti_volume = volume
+            self.nifti_affine = self.nifti_volume.affine
+            self.nifti_header = self.nifti_volume.header
+            stats = self.nifti_volume.compute_stats()
+            self.nifti_min, self.nifti_max = stats.min, stats.max
+            self.auto_window = window_from_range(
+                *stats.display_range(*DISPLAY_PERCENTILES)
+            )
+            self.window = self.current_window_preset()
+            self.nifti_accessors = {
+                view: self.nifti_volume.slice_accessor(view, CONTIGUOUS_COPY_BUDGET)
+                for view in VIEW_GEOMETRY
+            }
+            self.set_segmentation_store(
+                create_label_store(
+                    self.nifti_volume.shape, NUM_BRUSH_LABELS, SPARSE_LABEL_STORE
+                )
+            )
+            self.open_journal(self.nifti_volume.file_path)
 
             # 초기 슬라이스 인덱스
-            axial_index = self.nifti_array.shape[2] // 2
-            coronal_index = self.nifti_array.shape[1] // 2
-            sagittal_index = self.nifti_array.shape[0] // 2
+            axial_index = self.nifti_volume.shape[2] // 2
+            coronal_index = self.nifti_volume.shape[1] // 2
+            sagittal_index = self.nifti_volume.shape[0] // 2
 
             self.set_canvas_initial_background("axial", axial_index)
             self.set_canvas_initial_background("coronal", coronal_index)
             self.set_canvas_initial_background("sagittal", sagittal_index)
+            self.statusBar().clearMessage()
 
         except Exception as e:
-            print(f"Failed to load Image: {e}")
+            self.load_failed("volume", str(e))
+
+    def set_loading(self, loading):
+        self.load_progress_bar.setVisible(loading)
+        self.load_cancel_button.setVisible(loading)
+        if not loading:
+            self.load_progress_bar.reset()
+
+    def show_load_progress(self, kind, done, total):
+        self.load_progress_bar.setRange(0, total)
+        self.load_progress_bar.setValue(done)
+
+    def load_failed(self, kind, message):
+        if kind == "region_grow":
+            self.statusBar().showMessage(f"Region grow failed: {message}", 10000)
+            return
+        name = "Image" if kind == "volume" else "Segmentation"
+        print(f"Failed to load {name}: {message}")
+        self.statusBar().showMessage(f"Failed to load {name}: {message}", 10000)
+
+    def set_segmentation_store(self, segmentation_store):
+        """
+        Segmentation label store와 뷰별 accessor를 함께 교체하는 함수
+        """
+        self.segmentation_store = segmentation_store
+        self.segmentation_accessors = {
+            view: SliceAccessor(segmentation_store, view) for view in VIEW_GEOMETRY
+        }
+        self.label_stats = LabelStatistics.from_store(segmentation_store)
+        self.occupancy = SliceOccupancy.from_store(segmentation_store)
+        for canvas in self.canvas_list[0]:
+            canvas.set_occupancy(
+                ViewOccupancy(
+                    self.occupancy, self.segmentation_accessors[canvas.canvas_view]
+                )
+            )
+        self.refresh_label_panel()
 
     def set_canvas_initial_background(self, view_type, slice_index):
         """
@@ -248,16 +625,38 @@ class MainWindow(QMainWindow):
                 canvas.set_initial_background(
                     nifty_slice,
                     segmentation_slice,
-                    self.nifti_array.shape,
-                    np.min(self.nifti_array),
-                    np.max(self.nifti_array),
+                    self.nifti_volume.shape,
+                    self.nifti_min,
+                    self.nifti_max,
+                    self.window,
                 )
                 break
 
     def save_segmentation(self):
-        save_segmentation_dialog(
-            self, self.segmentation_array, self.nifti_affine, self.nifti_header
+        if self.segmentation_store is None:
+            return
+        save_thread = save_segmentation_dialog(
+            self,
+            self.segmentation_store,
+            self.nifti_affine,
+            self.nifti_header,
+            SAVE_COMPRESSION_LEVEL,
         )
+        if save_thread is None:
+            return
+        self.save_threads.add(save_thread)
+        save_thread.finished.connect(partial(self.save_threads.discard, save_thread))
+        if self.journal is not None:
+            save_thread.succeeded.connect(
+                partial(self.save_succeeded, self.journal, self.journal.revision)
+            )
+
+    def save_succeeded(self, journal, revision, file_path):
+        """
+        저장이 끝난 뒤, 저장 이후 편집이 없었다면 journal을 비우는 함수
+        """
+        if journal is self.journal and journal.revision == revision:
+            journal.discard()
 
     def load_segmentation(self):
         file_path = load_segmentation_dialog(self)
@@ -265,17 +664,76 @@ class MainWindow(QMainWindow):
             self.load_segmentation_file(file_path)
 
     def load_segmentation_file(self, file_path):
+        """
+        Segmentation을 백그라운드에서 읽기 시작하는 함수 (완료 시 set_loaded_segmentation 호출)
+        """
+        if self.nifti_volume is None:
+            return
+
+        # Header만 읽어 shape/affine 불일치를 데이터 디코딩 전에 즉시 거부
         try:
-            segmentation_array = nib.load(file_path).get_fdata()
-            if segmentation_array.shape == self.nifti_array.shape:
-                self.segmentation_array = segmentation_array
-                self.update_all_canvases()
-            else:
-                print(
-                    "Error: The dimensions of the segmentation file do not match the current Image."
-                )
+            check_segmentation_header(
+                nib.load(file_path),
+                self.nifti_volume.shape,
+                self.nifti_volume.canonical_affine,
+            )
         except Exception as e:
-            print(f"Failed to load Segmentation: {e}")
+            self.load_failed("segmentation", str(e))
+            return
+
+        self.statusBar().showMessage(f"Loading {file_path}")
+        self.loader.load_segmentation(
+            file_path,
+            self.nifti_volume.shape,
+            self.nifti_volume.canonical_affine,
+            NUM_BRUSH_LABELS,
+            SPARSE_LABEL_STORE,
+        )
+
+    def set_loaded_segmentation(self, segmentation_store):
+        if (
+            self.nifti_volume is None
+            or segmentation_store.shape != self.nifti_volume.shape
+        ):
+            return
+        self.set_segmentation_store(segmentation_store)
+        self.history.clear()
+        self.journal_checkpoint()
+        self.update_all_canvases()
+        self.statusBar().clearMessage()
+
+    def current_window_preset(self):
+        name = self.window_dropdown.currentText()
+        return WINDOW_PRESETS.get(name, self.auto_window)
+
+    def change_window_preset(self, index):
+        """
+        Window/level preset을 모든 canvas에 적용하는 함수 (캐시된 슬라이스는 그대로 사용)
+        """
+        window = self.current_window_preset()
+        if window is None:
+            return
+        self.set_window_level(*window)
+
+    def set_window_level(self, width, level, source_view=None):
+        self.window = (width, level)
+        for canvas in self.canvas_list[0]:
+            if canvas.canvas_view != source_view:
+                canvas.set_window_level(width, level)
+
+    def sync_window_level(self, width, level):
+        """
+        한 canvas에서 마우스로 조절한 window/level을 다른 canvas에도 맞추는 함수
+        """
+        self.set_window_level(width, level, self.sender().canvas_view)
+
+    def set_show_stats(self, show):
+        for canvas in self.canvas_list[0]:
+            canvas.set_show_stats(show)
+
+    def export_trace(self):
+        path = tracing.export_chrome_trace()
+        self.statusBar().showMessage(f"Trace written to {path}", 10000)
 
     def change_brush_size(self, index):
         brush_sizes = [1, 2, 4, 8, 16, 32]
@@ -289,8 +747,110 @@ class MainWindow(QMainWindow):
         for canvas in self.canvas_list[0]:
             canvas.set_brush_color_value(brush_color_value)
 
+    def change_tool(self, index):
+        tool = ["brush", "region_grow"][index]
+        for canvas in self.canvas_list[0]:
+            canvas.set_tool(tool)
+
+    def start_region_grow(self, canvas_view, slice_index, row, col):
+        """
+        클릭한 voxel을 seed로 tolerance 안의 연결 영역을 백그라운드에서 찾는 함수
+        (완료 시 apply_region_grow 호출). 계산은 axial 슬라이스 단위로 진행됨
+        """
+        if self.segmentation_store is None:
+            return
+
+        # 클릭한 뷰 좌표를 axial 뷰 좌표로 변환
+        seed_box = self.segmentation_accessors[canvas_view].volume_box(
+            slice_index, (row, row + 1), (col, col + 1)
+        )
+        (seed_index, _), (seed_row, seed_col, _, _) = self.segmentation_accessors[
+            "axial"
+        ].view_region(seed_box)
+
+        label = self.canvas_for_view(canvas_view).brush_color_value
+        self.region_grow_target = (self.segmentation_store, label)
+        accessor = self.nifti_accessors["axial"]
+        self.statusBar().showMessage("Growing region...")
+        self.loader.grow_region(
+            accessor.get,
+            accessor.num_slices,
+            (seed_index, seed_row, seed_col),
+            self.tolerance_spin_box.value(),
+            REGION_GROW_MAX_VOXELS,
+        )
+
+    def apply_region_grow(self, region):
+        """
+        Region grow 결과를 현재 label로 store에 쓰고, 하나의 undo 단계로 기록한 뒤
+        영역에 걸친 슬라이스만 무효화하는 함수
+        """
+        segmentation_store, label = self.region_grow_target
+        self.region_grow_target = None
+        # 계산 중 이미지/segmentation이 교체되었으면 결과를 버림
+        if segmentation_store is not self.segmentation_store or not len(region):
+            return
+
+        accessor = self.segmentation_accessors["axial"]
+        self.history.end_entry()
+        for slice_index, bounding_box, mask in region.items():
+            y_min, x_min, y_max, x_max = bounding_box
+            rows, cols = (y_min, y_max), (x_min, x_max)
+            old_values = accessor.view_slice(slice_index, rows, cols).copy()
+            new_values = old_values.copy()
+            new_values[mask] = label
+            accessor.write_slice(slice_index, new_values, rows, cols)
+            self.record_label_change(
+                "axial", slice_index, bounding_box, old_values, new_values
+            )
+            self.journal_patch("axial", slice_index, bounding_box, new_values)
+            self.history.record(
+                SlicePatch("axial", slice_index, bounding_box, old_values, new_values)
+            )
+        self.history.end_entry()
+
+        self.invalidate_volume_box(accessor.region_box(*region.bounding_box()))
+        self.refresh_label_panel()
+        self.statusBar().showMessage(
+            f"Region grow filled {region.voxel_count} voxels", 5000
+        )
+
     def clear_all_segmentations(self):
-        if self.segmentation_array is not None:
-            self.segmentation_array.fill(0)
+        if self.segmentation_store is not None:
+            if not self.segmentation_store.is_empty():
+                self.history.record_entry(ClearPatch(self.segmentation_store))
+            self.segmentation_store.clear()
+            self.label_stats.clear()
+            self.occupancy.clear()
+            if self.journal is not None:
+                self.journal.record_clear()
         for canvas in self.canvas_list[0]:
             canvas.clear_all_segmentations()
+        self.refresh_label_panel()
+
+    def voxel_spacing(self):
+        """Voxel size (mm) along each axis from the image header."""
+        if self.nifti_header is None:
+            return (1.0, 1.0, 1.0)
+        return tuple(float(zoom) for zoom in self.nifti_header.get_zooms()[:3])
+
+    def label_volumes(self):
+        """
+        Label별 voxel 수와 부피를 반환하는 함수 (volume scan 없이 label 수에 비례)
+        :return: {label: (voxel count, volume in mL)}
+        """
+        volumes = self.label_stats.volumes_ml(self.voxel_spacing())
+        return {
+            label: (count, volumes[label])
+            for label, count in self.label_stats.voxel_counts().items()
+        }
+
+    def refresh_label_panel(self):
+        if not self.label_dock.isVisible():
+            return
+        volumes = self.label_volumes()
+        self.label_table.setRowCount(len(volumes))
+        for row, (label, (count, volume_ml)) in enumerate(sorted(volumes.items())):
+            name = LABEL_NAMES[label] if label < len(LABEL_NAMES) else str(label)
+            for column, text in enumerate((name, str(count), f"{volume_ml:.2f}")):
+                self.label_table.setItem(row, column, QTableWidgetItem(text))